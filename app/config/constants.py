@@ -2,14 +2,13 @@
 Application constants.
 These are hardcoded values that don't change between environments.
 """
-
-# Intent Classification Constants
-INTENT_CATEGORIES = [
+# Intent Classification Constants (frozenset: O(1) membership checks)
+INTENT_CATEGORIES = frozenset({
     "BROWSING",          # Just looking around, no specific interest
     "RESEARCHING",       # Actively gathering information
     "CONSIDERING",       # Seriously considering options
     "HOT_LEAD"          # Ready to engage, high conversion potential
-]
+})
 
 # Conversation Stage Constants
 CONVERSATION_STAGES = {
@@ -1,17 +1,42 @@
 """
 Logging configuration for the application.
 """
+import atexit
 import logging
+import queue
 import sys
+import threading
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
 from .settings import settings
 
+# Records buffered before the main log file is written (errors flush at once)
+FILE_BUFFER_CAPACITY = 1000
+FILE_FLUSH_INTERVAL = 1.0  # seconds
+
+# Drains queued records to the real handlers on a background thread
+_listener: Optional[QueueListener] = None
+_file_buffer: Optional[MemoryHandler] = None
+_flush_stop: Optional[threading.Event] = None
+_atexit_registered = False
+
+
+def _flush_periodically(buffer: MemoryHandler, stop: threading.Event):
+    """Write buffered records to disk every FILE_FLUSH_INTERVAL seconds."""
+    while not stop.wait(FILE_FLUSH_INTERVAL):
+        buffer.flush()
+
 
 def setup_logging():
     """
     Configure application logging with both file and console handlers.
+
+    Records are put on an in-memory queue by the only root handler; a
+    QueueListener thread does the console/file writes so request handlers
+    never block on log I/O.
     """
+    global _listener, _file_buffer, _flush_stop, _atexit_registered
     # Create logs directory if it doesn't exist
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
@@ -22,6 +47,7 @@ def setup_logging():
 
     # Remove existing handlers
     logger.handlers.clear()
+    stop_logging()
 
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
@@ -31,7 +57,6 @@ def setup_logging():
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     console_handler.setFormatter(console_format)
-    logger.addHandler(console_handler)
 
     # File handler (rotating)
     file_handler = RotatingFileHandler(
@@ -45,7 +70,6 @@ def setup_logging():
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     file_handler.setFormatter(file_format)
-    logger.addHandler(file_handler)
 
     # Error file handler (separate file for errors)
     error_handler = RotatingFileHandler(
@@ -55,7 +79,30 @@ def setup_logging():
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(file_format)
-    logger.addHandler(error_handler)
+
+    # Batch writes to the main log: flushed when full, on ERROR, or every second
+    _file_buffer = MemoryHandler(
+        FILE_BUFFER_CAPACITY, flushLevel=logging.ERROR, target=file_handler
+    )
+    _file_buffer.setLevel(logging.INFO)
+    _flush_stop = threading.Event()
+    threading.Thread(
+        target=_flush_periodically, args=(_file_buffer, _flush_stop),
+        name="log-flush", daemon=True
+    ).start()
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    _listener = QueueListener(
+        log_queue, console_handler, _file_buffer, error_handler,
+        respect_handler_level=True
+    )
+    _listener.start()
+    # Flush buffered records even if the process exits without a lifespan
+    # shutdown (scripts, Ctrl-C before startup completes)
+    if not _atexit_registered:
+        atexit.register(stop_logging)
+        _atexit_registered = True
 
     # Suppress verbose logs from third-party libraries
     logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -68,6 +115,25 @@ def setup_logging():
     return logger
 
 
+def stop_logging():
+    """
+    Flush queued and buffered records and stop the logging threads.
+    """
+    global _listener, _file_buffer, _flush_stop
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _flush_stop is not None:
+        _flush_stop.set()
+        _flush_stop = None
+    if _file_buffer is not None:
+        target = _file_buffer.target
+        _file_buffer.close()  # flushes remaining records to the file
+        if target is not None:
+            target.close()
+        _file_buffer = None
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     Get a logger instance for a specific module.
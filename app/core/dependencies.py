@@ -4,12 +4,15 @@ FastAPI dependencies for dependency injection.
 from typing import AsyncGenerator
 import aiosqlite
 from app.config.settings import settings
+from app.models import database
 
 
 async def get_db() -> AsyncGenerator[aiosqlite.Connection, None]:
     """
     Database connection dependency.
-    Provides an async SQLite connection that is automatically closed after use.
+    Provides the application's shared SQLite connection (WAL mode, rows as
+    aiosqlite.Row) via app.models.database.get_db, so routes and services
+    use the same connection and the same write lock.
 
     Usage:
         @app.get("/example")
@@ -20,12 +23,7 @@ async def get_db() -> AsyncGenerator[aiosqlite.Connection, None]:
     Yields:
         aiosqlite.Connection: Database connection
     """
-    # Extract just the path from the database URL
-    db_path = settings.DATABASE_URL.replace("sqlite+aiosqlite:///", "")
-
-    async with aiosqlite.connect(db_path) as db:
-        # Enable row factory for dict-like access
-        db.row_factory = aiosqlite.Row
+    async with database.get_db() as db:
         yield db
 
 
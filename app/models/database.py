@@ -1,5 +1,6 @@
 """SQLite tables and helpers for IVY AI Counsellor."""
 import os
+import asyncio
 import aiosqlite
 from contextlib import asynccontextmanager
 
@@ -59,30 +60,104 @@ CREATE TABLE IF NOT EXISTS pdf_library (
     category    TEXT NOT NULL,
     chunk_count INTEGER DEFAULT 0,
     status      TEXT DEFAULT 'ACTIVE',
+    content_hash TEXT,
     upload_date DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE TABLE IF NOT EXISTS chunks (
+    pdf_id    TEXT NOT NULL,
+    chunk_idx INTEGER NOT NULL,
+    text      TEXT NOT NULL,
+    PRIMARY KEY (pdf_id, chunk_idx)
+);
+
 CREATE INDEX IF NOT EXISTS idx_conv_session ON conversations(session_id);
 CREATE INDEX IF NOT EXISTS idx_leads_score ON leads(lead_score DESC);
 CREATE INDEX IF NOT EXISTS idx_unans_time ON unanswered_queries(timestamp);
 """
 
 
+# Columns added after the first release: (table, column, type)
+MIGRATIONS = [
+    ("pdf_library", "content_hash", "TEXT"),
+]
+
+# Indexes on migrated columns (must run after MIGRATIONS)
+POST_MIGRATION_SCHEMA = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pdf_hash ON pdf_library(content_hash) WHERE status = 'ACTIVE';
+"""
+
+
 async def init_db():
     """Create all tables on app startup."""
     async with aiosqlite.connect(DB_PATH) as db:
+        # journal_mode persists in the file, so every later connection uses WAL
+        await db.execute("PRAGMA journal_mode=WAL")
         await db.executescript(SCHEMA)
+        for table, column, col_type in MIGRATIONS:
+            cursor = await db.execute(f"PRAGMA table_info({table})")
+            existing = {row[1] for row in await cursor.fetchall()}
+            if column not in existing:
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+        await db.executescript(POST_MIGRATION_SCHEMA)
         await db.commit()
 
 
+# Long-lived connection shared by services (SQLite serializes writes anyway)
+_shared_conn: aiosqlite.Connection | None = None
+# WAL allows many readers but one writer; multi-statement writes hold this
+db_write_lock = asyncio.Lock()
+
+
+async def get_shared_db() -> aiosqlite.Connection:
+    """Return the process-wide connection, opening it in WAL mode on first use."""
+    global _shared_conn
+    if _shared_conn is None:
+        conn = await aiosqlite.connect(DB_PATH)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        await conn.execute("PRAGMA cache_size=-64000")  # 64 MB page cache
+        await conn.execute("PRAGMA temp_store=MEMORY")
+        conn.row_factory = aiosqlite.Row
+        _shared_conn = conn
+    return _shared_conn
+
+
+@asynccontextmanager
+async def write_transaction():
+    """Run a write on the shared connection under db_write_lock.
+
+    Commits when the block finishes and rolls back if it raises, so a failed
+    statement never leaves an open transaction for another caller's commit.
+    """
+    conn = await get_shared_db()
+    async with db_write_lock:
+        try:
+            yield conn
+        except BaseException:
+            await conn.rollback()
+            raise
+        await conn.commit()
+
+
+async def close_shared_db():
+    """Close the shared connection (call on shutdown)."""
+    global _shared_conn
+    if _shared_conn is not None:
+        await _shared_conn.close()
+        _shared_conn = None
+
+
 @asynccontextmanager
 async def get_db():
-    """Async context manager for DB connection."""
-    conn = await aiosqlite.connect(DB_PATH)
-    try:
+    """Async context manager for the shared DB connection.
+
+    The block runs as one write_transaction: other users of the connection
+    wait on db_write_lock, and a failure rolls back instead of leaving work
+    for someone else's commit.
+    """
+    async with write_transaction() as conn:
         yield conn
-    finally:
-        await conn.close()
 
 
 async def save_conversation(
@@ -165,6 +240,28 @@ async def get_lead_by_session(conn, session_id: str):
     return row
 
 
+async def save_chunks(conn, pdf_id: str, texts: list[str]):
+    """Store full chunk texts so Pinecone metadata only carries a preview."""
+    await conn.executemany(
+        "INSERT OR REPLACE INTO chunks (pdf_id, chunk_idx, text) VALUES (?, ?, ?)",
+        [(pdf_id, idx, text) for idx, text in enumerate(texts)],
+    )
+
+
+async def get_chunk_texts(conn, keys: list[tuple[str, int]]) -> dict[tuple[str, int], str]:
+    """Fetch chunk texts for (pdf_id, chunk_idx) pairs in a single query."""
+    if not keys:
+        return {}
+    placeholders = ", ".join("(?, ?)" for _ in keys)
+    params = [v for key in keys for v in key]
+    cursor = await conn.execute(
+        f"SELECT pdf_id, chunk_idx, text FROM chunks WHERE (pdf_id, chunk_idx) IN (VALUES {placeholders})",
+        params,
+    )
+    rows = await cursor.fetchall()
+    return {(row[0], row[1]): row[2] for row in rows}
+
+
 async def set_lead_notified(conn, session_id: str, notified_at: str):
     await conn.execute(
         "UPDATE leads SET notified_at = ? WHERE session_id = ?",
@@ -402,9 +402,15 @@ async def upload_pdf(
         # Clean up temporary file
         os.unlink(tmp_path)
         
+        if summary.duplicate:
+            message = f"PDF already in knowledge base: {summary.total_chunks} chunks reused"
+        else:
+            message = f"PDF ingested successfully: {summary.total_chunks} chunks created"
+
         return {
             "success": True,
-            "message": f"PDF ingested successfully: {summary.total_chunks} chunks created",
+            "message": message,
+            "duplicate": summary.duplicate,
             "pdf_id": summary.pdf_id,
             "filename": summary.filename,
             "category": summary.category,
@@ -2,6 +2,7 @@
 import os
 import logging
 from typing import Literal
+from cachetools import LRUCache
 from openai import AsyncOpenAI
 from app.models.database import get_db, log_unanswered
 
@@ -28,6 +29,12 @@ TEMPLATES = {
     "Please share your name and number.",
 }
 
+_client: AsyncOpenAI | None = None
+
+CLASSIFY_CACHE_SIZE = int(os.getenv("CLASSIFY_CACHE_SIZE", "2048"))
+# Message text (as sent to the model) -> label; repeated messages skip the call
+_classify_cache: LRUCache = LRUCache(maxsize=CLASSIFY_CACHE_SIZE)
+
 CLASSIFY_PROMPT = """Classify this user message into exactly one category. Reply with only one word.
 
 Categories:
@@ -48,13 +55,25 @@ User message:
 """
 
 
+def get_classifier_client(key: str) -> AsyncOpenAI:
+    """Return the shared OpenAI client so calls reuse pooled connections."""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(api_key=key)
+    return _client
+
+
 async def classify_query(query: str) -> Literal["study_abroad", "off_topic", "sensitive"]:
     """Call OpenAI to classify query."""
     key = os.getenv("OPENAI_API_KEY")
     if not key:
         return "study_abroad"
+    text = query[:500]
+    cached = _classify_cache.get(text)
+    if cached is not None:
+        return cached
     try:
-        client = AsyncOpenAI(api_key=key)
+        client = get_classifier_client(key)
         r = await client.chat.completions.create(
             model="gpt-4o-mini",
             max_tokens=20,
@@ -65,16 +84,20 @@ async def classify_query(query: str) -> Literal["study_abroad", "off_topic", "se
                 },
                 {
                     "role": "user",
-                    "content": CLASSIFY_PROMPT + query[:500]
+                    "content": CLASSIFY_PROMPT + text
                 }
             ],
         )
-        text = (r.choices[0].message.content or "").strip().lower()
-        if "off_topic" in text or "off topic" in text:
-            return "off_topic"
-        if "sensitive" in text:
-            return "sensitive"
-        return "study_abroad"
+        reply = (r.choices[0].message.content or "").strip().lower()
+        if "off_topic" in reply or "off topic" in reply:
+            label = "off_topic"
+        elif "sensitive" in reply:
+            label = "sensitive"
+        else:
+            label = "study_abroad"
+        # Only real answers are cached; failures fall back without caching
+        _classify_cache[text] = label
+        return label
     except Exception as e:
         logger.warning("Classify failed: %s", e)
         return "study_abroad"
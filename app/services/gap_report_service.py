@@ -17,7 +17,6 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 from zoneinfo import ZoneInfo
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import aiosqlite
 
 from app.models.database import DB_PATH
@@ -618,27 +617,27 @@ async def generate_and_send_gap_report(days: int = 7) -> dict:
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
-#  STEP 7 — APScheduler — every Monday 9:00 AM IST
+#  STEP 7 — Schedule — every Monday 9:00 AM IST
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def schedule_gap_report(scheduler: AsyncIOScheduler) -> None:
-    """Register weekly gap report job with APScheduler."""
+def next_gap_report_run(now: datetime) -> datetime:
+    """Return the first Monday 9:00 AM IST strictly after `now`."""
+    run = now.astimezone(IST).replace(hour=9, minute=0, second=0, microsecond=0)
+    run += timedelta(days=-run.weekday() % 7)
+    if run <= now:
+        run += timedelta(weeks=1)
+    return run
 
-    def _run():
-        try:
-            loop = asyncio.get_running_loop()
-            loop.create_task(generate_and_send_gap_report(days=7))
-        except RuntimeError:
-            asyncio.run(generate_and_send_gap_report(days=7))
-
-    scheduler.add_job(
-        _run,
-        trigger   = "cron",
-        day_of_week = "mon",
-        hour      = 9,
-        minute    = 0,
-        timezone  = IST,
-        id        = "weekly_gap_report",
-        replace_existing = True,
-    )
+
+async def run_weekly_gap_report() -> None:
+    """Send the gap report every Monday 9:00 AM IST until cancelled."""
     logger.info("Gap report scheduled: every Monday 9:00 AM IST")
+    while True:
+        next_run = next_gap_report_run(datetime.now(IST))
+        # Loop in case the wall clock moved while sleeping
+        while (delay := (next_run - datetime.now(IST)).total_seconds()) > 0:
+            await asyncio.sleep(delay)
+        try:
+            await generate_and_send_gap_report(days=7)
+        except Exception as e:
+            logger.error("Weekly gap report failed: %s", e, exc_info=True)
@@ -1,15 +1,17 @@
 """Intent classifier and lead scoring (run after every 3rd message)."""
 import os
-import json
 import re
 import logging
+import orjson
+from app.config.constants import INTENT_CATEGORIES
 from app.models.schemas import IntentResult, ExtractedProfile
-from app.utils.memory import get_history
+from app.utils.memory import get_history_async
 
 import anthropic
 
 logger = logging.getLogger(__name__)
 MODEL = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-5")
+_client: anthropic.AsyncAnthropic | None = None
 
 INTENT_PROMPT = """You are analyzing a study-abroad counselling conversation. Extract intent and profile. Reply with valid JSON only, no markdown.
 
@@ -56,19 +58,27 @@ def _parse_json_from_text(text: str) -> dict:
         end = text.rfind("}") + 1
         if start >= 0 and end > start:
             text = text[start:end]
-    return json.loads(text)
+    return orjson.loads(text)
+
+
+def get_intent_client(key: str) -> anthropic.AsyncAnthropic:
+    """Return the shared Anthropic client so calls reuse pooled connections."""
+    global _client
+    if _client is None:
+        _client = anthropic.AsyncAnthropic(api_key=key)
+    return _client
 
 
 async def run_intent(session_id: str) -> IntentResult | None:
     """Call Claude with conversation history; return IntentResult."""
-    messages = get_history(session_id)
+    messages = await get_history_async(session_id)
     if not messages:
         return None
     key = os.getenv("ANTHROPIC_API_KEY")
     if not key:
         return None
     try:
-        client = anthropic.AsyncAnthropic(api_key=key)
+        client = get_intent_client(key)
         # Build single user message with conversation
         conv_text = "\n".join(
             f"{m['role']}: {m['content'][:300]}" for m in messages[-20:]
@@ -92,8 +102,12 @@ async def run_intent(session_id: str) -> IntentResult | None:
             ielts_score=ep.get("ielts_score"),
             percentage=ep.get("percentage"),
         )
+        intent_level = data.get("intent_level", "BROWSING")
+        if intent_level not in INTENT_CATEGORIES:
+            logger.warning("Unknown intent level %r, using BROWSING", intent_level)
+            intent_level = "BROWSING"
         return IntentResult(
-            intent_level=data.get("intent_level", "BROWSING"),
+            intent_level=intent_level,
             lead_score=int(data.get("lead_score", 0)),
             extracted_profile=profile,
             conversation_summary=data.get("conversation_summary", ""),
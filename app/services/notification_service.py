@@ -7,13 +7,18 @@ import logging
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 import httpx
+import orjson
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
 
 from app.models.schemas import IntentResult
-from app.models.database import get_db, get_lead_by_session, set_lead_notified, upsert_lead
+from app.models.database import (
+    get_shared_db, write_transaction, get_lead_by_session, set_lead_notified, upsert_lead,
+)
 
 logger = logging.getLogger(__name__)
 
-COUNSELLOR_WHATSAPP = os.getenv("COUNSELLOR_WHATSAPP", "")
+COUNSELLOR_WHATSAPP = os.getenv("COUNSELLOR_WHATSAPP", "")  # comma-separated for a team
 COUNSELLOR_EMAIL = os.getenv("COUNSELLOR_EMAIL", "")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "")
 SENDGRID_KEY = os.getenv("SENDGRID_API_KEY", "")
@@ -21,6 +26,15 @@ META_TOKEN = os.getenv("META_WHATSAPP_TOKEN", "")
 PHONE_ID = os.getenv("META_PHONE_NUMBER_ID", "")
 HOT_THRESHOLD = int(os.getenv("HOT_LEAD_THRESHOLD", "60"))
 COOLDOWN_MIN = int(os.getenv("NOTIFICATION_COOLDOWN_MINUTES", "30"))
+WHATSAPP_MAX_PER_SECOND = int(os.getenv("WHATSAPP_MAX_PER_SECOND", "50"))
+COOLDOWN_CACHE_SIZE = int(os.getenv("NOTIFICATION_COOLDOWN_CACHE_SIZE", "10000"))
+
+# Token bucket shared by all sends, kept well under Meta's per-number throughput cap
+_wa_limit = AsyncLimiter(WHATSAPP_MAX_PER_SECOND, 1)
+
+# Sessions notified within the cooldown; entries expire on their own and are
+# purged on insert, so the map stays bounded (DB stays the cross-worker backup)
+_cooldown: TTLCache = TTLCache(maxsize=COOLDOWN_CACHE_SIZE, ttl=COOLDOWN_MIN * 60)
 
 
 def _whatsapp_body(result: IntentResult, session_id: str) -> str:
@@ -58,7 +72,7 @@ async def send_whatsapp_alert(to_number: str, body: str) -> bool:
         async with httpx.AsyncClient() as client:
             r = await client.post(
                 url,
-                json=payload,
+                content=orjson.dumps(payload),
                 headers={"Authorization": f"Bearer {META_TOKEN}", "Content-Type": "application/json"},
                 timeout=10.0,
             )
@@ -71,34 +85,57 @@ async def send_whatsapp_alert(to_number: str, body: str) -> bool:
         return False
 
 
+async def broadcast_whatsapp(to_numbers: list[str], body: str) -> list[bool]:
+    """Send the same alert to several numbers concurrently, rate-limited."""
+    async def _one(number: str) -> bool:
+        async with _wa_limit:
+            return await send_whatsapp_alert(number, body)
+
+    results = await asyncio.gather(*(_one(n) for n in to_numbers), return_exceptions=True)
+    return [r is True for r in results]
+
+
+EMAIL_PRIMARY = "#1B5E20"
+
+_EMAIL_ROW = (
+    "<tr><td style='padding:6px;border:1px solid #ccc'>{k}</td>"
+    "<td style='padding:6px;border:1px solid #ccc'>{v}</td></tr>"
+)
+_EMAIL_SHELL = """
+    <div style="font-family:sans-serif; max-width:600px;">
+      <h2 style="color:{primary}">HOT LEAD ALERT - IVY AI Counsellor</h2>
+      <p><strong>Session:</strong> {session_id}</p>
+      <table style="border-collapse:collapse;">{rows}</table>
+      <p><strong>Summary:</strong> {summary}</p>
+      <p><strong>Recommended action:</strong> {action}</p>
+      <p style="color:{primary}; margin-top:24px;">IVY Overseas</p>
+    </div>
+    """
+
+
 def _email_html(result: IntentResult, session_id: str) -> str:
     p = result.extracted_profile
-    primary = "#1B5E20"
-    accent = "#F9A825"
-    rows = [
+    rows = (
         ("Name", p.name or "-"),
         ("Phone", p.phone or "-"),
         ("Email", p.email or "-"),
         ("Course", p.target_course or "-"),
         ("Country", p.target_country or "-"),
         ("Intake", p.target_intake or "-"),
-        ("Budget (INR)", str(p.budget_inr) if p.budget_inr else "-"),
+        ("Budget (INR)", p.budget_inr or "-"),
         ("IELTS", p.ielts_score or "-"),
         ("Percentage", p.percentage or "-"),
-        ("Lead Score", str(result.lead_score)),
+        ("Lead Score", result.lead_score),
         ("Intent", result.intent_level),
-    ]
-    trs = "".join(f"<tr><td style='padding:6px;border:1px solid #ccc'>{k}</td><td style='padding:6px;border:1px solid #ccc'>{v}</td></tr>" for k, v in rows)
-    return f"""
-    <div style="font-family:sans-serif; max-width:600px;">
-      <h2 style="color:{primary}">HOT LEAD ALERT - IVY AI Counsellor</h2>
-      <p><strong>Session:</strong> {session_id}</p>
-      <table style="border-collapse:collapse;">{trs}</table>
-      <p><strong>Summary:</strong> {result.conversation_summary}</p>
-      <p><strong>Recommended action:</strong> {result.recommended_action}</p>
-      <p style="color:{primary}; margin-top:24px;">IVY Overseas</p>
-    </div>
-    """
+    )
+    trs = "".join(_EMAIL_ROW.format(k=k, v=v) for k, v in rows)
+    return _EMAIL_SHELL.format(
+        primary=EMAIL_PRIMARY,
+        session_id=session_id,
+        rows=trs,
+        summary=result.conversation_summary,
+        action=result.recommended_action,
+    )
 
 
 async def send_email_alert(to_email: str, subject: str, html: str) -> bool:
@@ -122,8 +159,10 @@ async def send_email_alert(to_email: str, subject: str, html: str) -> bool:
 
 async def should_skip_notification(session_id: str) -> bool:
     """True if we already notified this session within cooldown."""
-    async with get_db() as conn:
-        row = await get_lead_by_session(conn, session_id)
+    if session_id in _cooldown:
+        return True
+    conn = await get_shared_db()
+    row = await get_lead_by_session(conn, session_id)
     if not row:
         return False
     notified_at = row[15] if len(row) > 15 else None  # notified_at column
@@ -143,7 +182,9 @@ async def notify_hot_lead(session_id: str, result: IntentResult) -> None:
     if result.lead_score < HOT_THRESHOLD:
         return
     p = result.extracted_profile
-    async with get_db() as conn:
+    # upsert_lead commits; the lock keeps that commit from flushing another
+    # service's half-finished transaction on the shared connection
+    async with write_transaction() as conn:
         await upsert_lead(
             conn,
             session_id=session_id,
@@ -166,10 +207,12 @@ async def notify_hot_lead(session_id: str, result: IntentResult) -> None:
         return
     body = _whatsapp_body(result, session_id)
     html = _email_html(result, session_id)
+    counsellor_numbers = [n.strip() for n in COUNSELLOR_WHATSAPP.split(",") if n.strip()]
     await asyncio.gather(
-        send_whatsapp_alert(COUNSELLOR_WHATSAPP, body),
+        broadcast_whatsapp(counsellor_numbers, body),
         send_email_alert(COUNSELLOR_EMAIL, "HOT LEAD - IVY AI Counsellor", html),
     )
+    _cooldown[session_id] = True
     now = datetime.utcnow().isoformat() + "Z"
-    async with get_db() as conn:
+    async with write_transaction() as conn:
         await set_lead_notified(conn, session_id, now)
@@ -10,20 +10,28 @@ knowledge base:
 5. Save metadata to SQLite database
 """
 import os
+import re
 import uuid
 import time
+import asyncio
+import hashlib
 import logging
-from typing import NamedTuple
+import sqlite3
+import functools
+import multiprocessing
+from array import array
+from dataclasses import dataclass, field
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Iterator, NamedTuple
 from pathlib import Path
 
 import fitz  # PyMuPDF
 import tiktoken
-from pinecone import Pinecone
-import aiosqlite
-
-from app.utils.chunker import chunk_text
+from pinecone.grpc import PineconeGRPC
+from app.utils.chunker import chunk_pages
 from app.utils.embedder import embed_texts
-from app.models.database import DB_PATH
+from app.models.database import get_shared_db, write_transaction, save_chunks
 
 logger = logging.getLogger(__name__)
 
@@ -32,15 +40,36 @@ CHUNK_SIZE = 512  # tokens
 CHUNK_OVERLAP = 50  # tokens
 MAX_FILE_MB = 50
 VALID_CATEGORIES = {"visa", "university", "scholarship", "testprep", "finance", "poststudy", "sop"}
-PINECONE_NAMESPACE = "ivy"
+# Vectors are stored in one namespace per category; "ivy" holds pre-split data
+LEGACY_NAMESPACE = "ivy"
 BATCH_SIZE = 100  # Pinecone batch size
+EMBED_GROUP_SIZE = 128  # chunks embedded per OpenAI call while earlier groups upsert
+MAX_INFLIGHT_UPSERTS = 4
+UPSERT_THREADS = 30  # concurrent Pinecone batch upserts
+MAX_CONCURRENT_INGESTS = 4  # PDFs processed at once by ingest_pdfs_batch
+# PDFs with at least this many pages are extracted across worker processes
+PARALLEL_EXTRACT_MIN_PAGES = 16
+SCANNED_WORD_THRESHOLD = 10  # pages with fewer words are treated as scanned
+_WS_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\S+")
+# PyMuPDF's default text flags minus the post-processing we don't need:
+# ligatures are expanded, whitespace is normalized later, unmapped glyphs stay
+# U+FFFD instead of raw CIDs, and image blocks are never collected.
+TEXT_FLAGS = fitz.TEXTFLAGS_TEXT & ~(
+    fitz.TEXT_PRESERVE_LIGATURES
+    | fitz.TEXT_PRESERVE_WHITESPACE
+    | fitz.TEXT_CID_FOR_UNKNOWN_UNICODE
+    | fitz.TEXT_PRESERVE_IMAGES
+)
 
 # Configuration from environment
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY", "")
 PINECONE_INDEX = os.getenv("PINECONE_INDEX", "ivy-counsellor")
 
-# Global Pinecone client (lazy initialization)
-_pinecone_client: Pinecone | None = None
+# Worker processes for page extraction (lazy initialization)
+_extract_pool: ProcessPoolExecutor | None = None
+# Threads issuing Pinecone batch upserts in parallel (lazy initialization)
+_upsert_pool: ThreadPoolExecutor | None = None
 
 
 class PDFProcessingException(Exception):
@@ -56,12 +85,28 @@ class PageContent(NamedTuple):
     is_scanned: bool
 
 
-class ChunkMetadata(NamedTuple):
-    """Represents metadata for a text chunk."""
-    chunk_text: str
-    chunk_index: int
-    page_number: int
-    text_preview: str
+@dataclass
+class Chunks:
+    """Chunk texts and metadata as parallel columns (one entry per chunk).
+
+    Chunk indices are implicit: offset + position.
+    """
+    texts: list[str] = field(default_factory=list)
+    page_numbers: array = field(default_factory=lambda: array("i"))
+    previews: list[str] = field(default_factory=list)
+    offset: int = 0
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def slice(self, start: int, end: int) -> "Chunks":
+        """Columns for chunks [start, end), keeping their original indices."""
+        return Chunks(
+            texts=self.texts[start:end],
+            page_numbers=self.page_numbers[start:end],
+            previews=self.previews[start:end],
+            offset=self.offset + start,
+        )
 
 
 class IngestionSummary(NamedTuple):
@@ -76,21 +121,38 @@ class IngestionSummary(NamedTuple):
     time_taken_seconds: float
     success: bool
     error: str | None = None
+    duplicate: bool = False
 
 
+@functools.lru_cache(maxsize=1)
 def _get_pinecone_index():
     """
     Get or create Pinecone index instance.
-    Uses lazy initialization and caches the client.
+    Uses lazy initialization and caches the index handle (gRPC for cheaper
+    bulk upserts), so its channel is reused across ingests and deletes.
     """
-    global _pinecone_client
-
-    if _pinecone_client is None:
-        if not PINECONE_API_KEY:
-            raise PDFProcessingException("PINECONE_API_KEY not configured")
-        _pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
-
-    return _pinecone_client.Index(PINECONE_INDEX)
+    if not PINECONE_API_KEY:
+        raise PDFProcessingException("PINECONE_API_KEY not configured")
+    return PineconeGRPC(api_key=PINECONE_API_KEY).Index(PINECONE_INDEX)
+
+
+def _hash_file(file_path: str) -> str:
+    """Return a 16-byte blake2b hex digest of the file contents."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+async def _find_pdf_by_hash(content_hash: str) -> tuple[str, int] | None:
+    """Return (pdf_id, chunk_count) of an active PDF with identical content."""
+    db = await get_shared_db()
+    cursor = await db.execute(
+        "SELECT pdf_id, chunk_count FROM pdf_library WHERE content_hash = ? AND status = 'ACTIVE'",
+        (content_hash,)
+    )
+    return await cursor.fetchone()
 
 
 def _extract_page_content(page: fitz.Page, page_num: int) -> PageContent:
@@ -109,7 +171,7 @@ def _extract_page_content(page: fitz.Page, page_num: int) -> PageContent:
         PageContent with extracted text and metadata
     """
     try:
-        text = page.get_text()
+        text = page.get_text("text", flags=TEXT_FLAGS)
 
         # Check if page is empty
         if not text or not text.strip():
@@ -123,8 +185,9 @@ def _extract_page_content(page: fitz.Page, page_num: int) -> PageContent:
 
         # Check if page is scanned/image-only
         # Heuristic: if text is very short relative to page size, likely scanned
-        word_count = len(text.split())
-        is_likely_scanned = word_count < 10  # Less than 10 words likely scanned
+        # (counting stops at the threshold instead of splitting the whole page)
+        word_count = sum(1 for _ in islice(_WORD_RE.finditer(text), SCANNED_WORD_THRESHOLD))
+        is_likely_scanned = word_count < SCANNED_WORD_THRESHOLD
 
         if is_likely_scanned:
             logger.debug(f"Page {page_num}: Scanned/image-only page detected ({word_count} words)")
@@ -136,7 +199,7 @@ def _extract_page_content(page: fitz.Page, page_num: int) -> PageContent:
             )
 
         # Clean text: remove excessive whitespace
-        cleaned_text = " ".join(text.split())
+        cleaned_text = _WS_RE.sub(" ", text).strip()
 
         return PageContent(
             page_number=page_num,
@@ -155,7 +218,68 @@ def _extract_page_content(page: fitz.Page, page_num: int) -> PageContent:
         )
 
 
-def _extract_text_from_pdf(file_path: str) -> tuple[str, dict]:
+def _get_extract_pool() -> ProcessPoolExecutor:
+    """
+    Get or create the process pool used for page extraction.
+
+    Workers are spawned, not forked: the pool is used from to_thread workers
+    while logging, flush and upsert threads run, and a forked child could
+    inherit one of their locks mid-hold and deadlock.
+    """
+    global _extract_pool
+
+    if _extract_pool is None:
+        _extract_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    return _extract_pool
+
+
+def _get_upsert_pool() -> ThreadPoolExecutor:
+    """Get or create the thread pool used for Pinecone batch upserts."""
+    global _upsert_pool
+
+    if _upsert_pool is None:
+        _upsert_pool = ThreadPoolExecutor(max_workers=UPSERT_THREADS, thread_name_prefix="pinecone-upsert")
+
+    return _upsert_pool
+
+
+def start_pools() -> None:
+    """Create the extraction pool up front; call from the main thread at startup."""
+    _get_extract_pool()
+
+
+def shutdown_pools() -> None:
+    """Shut down the extraction and upsert pools if they were started."""
+    global _extract_pool, _upsert_pool
+
+    if _extract_pool is not None:
+        _extract_pool.shutdown(cancel_futures=True)
+        _extract_pool = None
+    if _upsert_pool is not None:
+        _upsert_pool.shutdown()
+        _upsert_pool = None
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> list[PageContent]:
+    """
+    Extract pages [start, end) of a PDF (0-indexed). Runs in worker processes,
+    so it opens its own document and returns only picklable PageContent.
+    """
+    doc = fitz.open(file_path)
+    try:
+        return [
+            _extract_page_content(doc.load_page(i), i + 1)
+            for i in range(start, end)
+        ]
+    finally:
+        doc.close()
+
+
+def _extract_text_from_pdf(file_path: str) -> tuple[list[PageContent], dict]:
     """
     Extract text from PDF file page by page.
 
@@ -163,26 +287,40 @@ def _extract_text_from_pdf(file_path: str) -> tuple[str, dict]:
         file_path: Path to PDF file
 
     Returns:
-        Tuple of (combined_text, stats_dict)
+        Tuple of (pages_with_text, stats_dict)
         stats_dict contains: total_pages, pages_processed, pages_skipped, etc.
     """
     try:
         doc = fitz.open(file_path)
     except Exception as e:
         raise PDFProcessingException(f"Failed to open PDF: {e}")
+    total_pages = len(doc)
+    doc.close()
 
-    page_contents = []
     stats = {
-        "total_pages": len(doc),
+        "total_pages": total_pages,
         "pages_processed": 0,
         "pages_empty": 0,
         "pages_scanned": 0,
     }
 
-    # Extract text from each page
-    for page_num, page in enumerate(doc, start=1):
-        content = _extract_page_content(page, page_num)
+    # Extract text from each page; large PDFs are sharded across processes
+    workers = os.cpu_count() or 1
+    if total_pages >= PARALLEL_EXTRACT_MIN_PAGES and workers > 1:
+        step = -(-total_pages // workers)  # ceil division
+        ranges = [(start, min(start + step, total_pages)) for start in range(0, total_pages, step)]
+        shards = _get_extract_pool().map(
+            _extract_page_range,
+            [file_path] * len(ranges),
+            [start for start, _ in ranges],
+            [end for _, end in ranges],
+        )
+        contents = [content for shard in shards for content in shard]
+    else:
+        contents = _extract_page_range(file_path, 0, total_pages)
 
+    page_contents = []
+    for content in contents:
         if content.is_empty:
             stats["pages_empty"] += 1
         elif content.is_scanned:
@@ -191,14 +329,6 @@ def _extract_text_from_pdf(file_path: str) -> tuple[str, dict]:
             page_contents.append(content)
             stats["pages_processed"] += 1
 
-    doc.close()
-
-    # Combine all page texts
-    combined_text = "\n\n".join(
-        f"[Page {pc.page_number}]\n{pc.text}"
-        for pc in page_contents
-    )
-
     stats["pages_skipped"] = stats["pages_empty"] + stats["pages_scanned"]
 
     logger.info(
@@ -207,68 +337,50 @@ def _extract_text_from_pdf(file_path: str) -> tuple[str, dict]:
         f"({stats['pages_empty']} empty, {stats['pages_scanned']} scanned)"
     )
 
-    return combined_text, stats
+    return page_contents, stats
 
 
 def _create_chunks_with_metadata(
-    text: str,
+    pages: list[PageContent],
     filename: str,
     category: str
-) -> list[ChunkMetadata]:
+) -> Chunks:
     """
-    Chunk text using tiktoken and create metadata for each chunk.
+    Chunk page texts using tiktoken and create metadata for each chunk.
 
     Args:
-        text: Combined text from PDF
+        pages: Pages with extracted text
         filename: Original filename
         category: Document category
 
     Returns:
-        List of ChunkMetadata objects
+        Chunks with texts, page numbers and previews
     """
-    # Chunk text using tiktoken (512 tokens, 50 overlap)
-    chunks = chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+    # Chunk text using tiktoken (512 tokens, 50 overlap); page numbers come
+    # back alongside each chunk rather than as markers inside the text
+    pairs = chunk_pages(
+        [(page.page_number, page.text) for page in pages],
+        chunk_size=CHUNK_SIZE,
+        overlap=CHUNK_OVERLAP
+    )
 
-    if not chunks:
+    if not pairs:
         logger.warning("No chunks produced from text")
-        return []
-
-    chunk_metadata_list = []
-
-    for idx, chunk in enumerate(chunks):
-        # Extract page number from chunk (if available)
-        # Format: [Page X]\n...
-        page_number = 1  # Default
-        if chunk.startswith("[Page "):
-            try:
-                page_end = chunk.find("]")
-                if page_end > 0:
-                    page_str = chunk[6:page_end]
-                    page_number = int(page_str)
-            except (ValueError, IndexError):
-                pass
-
-        # Create text preview (first 100 chars)
-        text_preview = chunk[:100]
-        if len(chunk) > 100:
-            text_preview += "..."
-
-        chunk_metadata_list.append(
-            ChunkMetadata(
-                chunk_text=chunk,
-                chunk_index=idx,
-                page_number=page_number,
-                text_preview=text_preview
-            )
-        )
+        return Chunks()
+
+    texts = [chunk for chunk, _ in pairs]
+    page_numbers = array("i", (page_number for _, page_number in pairs))
+
+    # Create text previews (first 100 chars)
+    previews = [chunk[:100] + "..." if len(chunk) > 100 else chunk for chunk in texts]
 
-    logger.info(f"Created {len(chunk_metadata_list)} chunks from text")
-    return chunk_metadata_list
+    logger.info(f"Created {len(texts)} chunks from text")
+    return Chunks(texts=texts, page_numbers=page_numbers, previews=previews)
 
 
 async def _upsert_to_pinecone(
     pdf_id: str,
-    chunks: list[ChunkMetadata],
+    chunks: Chunks,
     embeddings: list[list[float]],
     filename: str,
     category: str
@@ -278,7 +390,7 @@ async def _upsert_to_pinecone(
 
     Args:
         pdf_id: Unique PDF identifier
-        chunks: List of chunk metadata
+        chunks: Chunk columns (possibly a slice)
         embeddings: List of embedding vectors
         filename: Original filename
         category: Document category
@@ -290,70 +402,270 @@ async def _upsert_to_pinecone(
 
     index = _get_pinecone_index()
 
-    # Prepare upsert data
-    vectors_to_upsert = []
-    for chunk, embedding in zip(chunks, embeddings):
-        vectors_to_upsert.append({
-            "id": f"{pdf_id}_{chunk.chunk_index}",
+    # Vectors are built lazily, one BATCH_SIZE batch at a time
+    vectors = (
+        {
+            "id": f"{pdf_id}_{chunk_index}",
             "values": embedding,
             "metadata": {
                 "pdf_id": pdf_id,
                 "source_pdf": filename,
                 "category": category,
-                "chunk_index": chunk.chunk_index,
-                "page_number": chunk.page_number,
-                "text_preview": chunk.text_preview,
-                "text": chunk.chunk_text,  # Store full text in metadata
+                "chunk_index": chunk_index,
+                "page_number": page_number,
+                "text_preview": preview,
+                # Full text lives in the SQLite chunks table to keep vectors lean
             }
-        })
-
-    # Upsert in batches (Pinecone has limits)
-    total_upserted = 0
-    for i in range(0, len(vectors_to_upsert), BATCH_SIZE):
-        batch = vectors_to_upsert[i:i + BATCH_SIZE]
-
-        # Retry logic for Pinecone
-        for attempt in range(3):
-            try:
-                index.upsert(vectors=batch, namespace=PINECONE_NAMESPACE)
-                total_upserted += len(batch)
-                logger.debug(f"Upserted batch {i // BATCH_SIZE + 1}: {len(batch)} vectors")
-                break
-            except Exception as e:
-                if attempt == 2:  # Last attempt
-                    raise PDFProcessingException(f"Failed to upsert to Pinecone after 3 attempts: {e}")
-                logger.warning(f"Pinecone upsert attempt {attempt + 1} failed: {e}, retrying...")
-                time.sleep(1)  # Wait before retry
+        }
+        for chunk_index, page_number, preview, embedding in zip(
+            range(chunks.offset, chunks.offset + len(chunks)),
+            chunks.page_numbers, chunks.previews, embeddings
+        )
+    )
+
+    # Pinecone calls block, so run them off the event loop
+    total_upserted = await asyncio.to_thread(_upsert_batches, index, vectors, category)
 
     logger.info(f"Successfully upserted {total_upserted} vectors to Pinecone")
 
 
+def _upsert_batch(index, batch: list[dict], namespace: str, batch_num: int) -> int:
+    """Upsert one batch, retrying up to 3 times. Returns vectors upserted."""
+    for attempt in range(3):
+        try:
+            index.upsert(vectors=batch, namespace=namespace)
+            logger.debug(f"Upserted batch {batch_num}: {len(batch)} vectors")
+            return len(batch)
+        except Exception as e:
+            if attempt == 2:  # Last attempt
+                raise PDFProcessingException(f"Failed to upsert to Pinecone after 3 attempts: {e}")
+            logger.warning(f"Pinecone upsert attempt {attempt + 1} failed: {e}, retrying...")
+            time.sleep(1)  # Wait before retry
+
+
+def _iter_batches(vectors: Iterable[dict]) -> Iterator[list[dict]]:
+    """Yield lists of at most BATCH_SIZE vectors from any iterable."""
+    it = iter(vectors)
+    while batch := list(islice(it, BATCH_SIZE)):
+        yield batch
+
+
+def _upsert_batches(index, vectors: Iterable[dict], namespace: str) -> int:
+    """Upsert vectors in BATCH_SIZE batches issued in parallel. Returns vectors upserted."""
+    # Upsert in batches (Pinecone has limits); each batch retries independently
+    pool = _get_upsert_pool()
+    futures = [
+        pool.submit(_upsert_batch, index, batch, namespace, batch_num)
+        for batch_num, batch in enumerate(_iter_batches(vectors), start=1)
+    ]
+    return sum(future.result() for future in futures)
+
+
+async def _embed_and_upsert(
+    pdf_id: str,
+    chunks: Chunks,
+    filename: str,
+    category: str
+) -> None:
+    """
+    Embed chunks in groups and upsert each group while the next one embeds.
+
+    At most MAX_INFLIGHT_UPSERTS upserts run at once; if anything fails the
+    remaining upserts are cancelled before the error propagates.
+    """
+    inflight = asyncio.Semaphore(MAX_INFLIGHT_UPSERTS)
+    upserts: list[asyncio.Task] = []
+
+    async def upsert_group(group: Chunks, embeddings: list[list[float]]):
+        try:
+            await _upsert_to_pinecone(pdf_id, group, embeddings, filename, category)
+        finally:
+            inflight.release()
+
+    try:
+        for i in range(0, len(chunks), EMBED_GROUP_SIZE):
+            group = chunks.slice(i, i + EMBED_GROUP_SIZE)
+            embeddings = await embed_texts(group.texts)
+
+            if len(embeddings) != len(group):
+                raise PDFProcessingException(
+                    f"Embedding count mismatch: {len(embeddings)} embeddings for {len(group)} chunks"
+                )
+
+            await inflight.acquire()
+            upserts.append(asyncio.create_task(upsert_group(group, embeddings)))
+
+        await asyncio.gather(*upserts)
+    finally:
+        pending = [task for task in upserts if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
 async def _save_to_database(
     pdf_id: str,
     filename: str,
     category: str,
-    chunk_count: int
+    chunks: Chunks,
+    content_hash: str | None = None
 ) -> None:
     """
-    Save PDF metadata to SQLite database.
+    Save PDF metadata and full chunk texts to SQLite database.
 
     Args:
         pdf_id: Unique PDF identifier
         filename: Original filename
         category: Document category
-        chunk_count: Number of chunks created
+        chunks: Chunk columns
+        content_hash: blake2b digest of the file, used to skip re-ingestion
     """
-    async with aiosqlite.connect(DB_PATH) as db:
+    # Other coroutines share this connection; keep their commits out of ours
+    async with write_transaction() as db:
         await db.execute(
-            """INSERT INTO pdf_library (pdf_id, filename, category, chunk_count, status)
-               VALUES (?, ?, ?, ?, 'ACTIVE')""",
-            (pdf_id, filename, category, chunk_count)
+            """INSERT INTO pdf_library (pdf_id, filename, category, chunk_count, status, content_hash)
+               VALUES (?, ?, ?, ?, 'ACTIVE', ?)""",
+            (pdf_id, filename, category, len(chunks), content_hash)
         )
-        await db.commit()
+        await save_chunks(db, pdf_id, chunks.texts)
 
     logger.info(f"Saved PDF metadata to database: {pdf_id}")
 
 
+def _validate_pdf(file_path: str, category: str) -> float:
+    """Check category, existence and size. Returns the file size in MB."""
+    # Validate category
+    if category not in VALID_CATEGORIES:
+        raise PDFProcessingException(
+            f"Invalid category '{category}'. Valid categories: {', '.join(sorted(VALID_CATEGORIES))}"
+        )
+
+    # Validate file exists
+    if not os.path.exists(file_path):
+        raise PDFProcessingException(f"File not found: {file_path}")
+
+    # Validate file size
+    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    if size_mb > MAX_FILE_MB:
+        raise PDFProcessingException(
+            f"File too large: {size_mb:.2f}MB (max: {MAX_FILE_MB}MB)"
+        )
+    return size_mb
+
+
+def _duplicate_summary(
+    existing: tuple[str, int],
+    filename: str,
+    category: str,
+    start_time: float
+) -> IngestionSummary:
+    """Summary pointing at an already ingested PDF with identical content."""
+    existing_id, chunk_count = existing
+    return IngestionSummary(
+        pdf_id=existing_id,
+        filename=filename,
+        category=category,
+        total_pages=0,
+        pages_processed=0,
+        pages_skipped=0,
+        total_chunks=chunk_count,
+        time_taken_seconds=round(time.time() - start_time, 2),
+        success=True,
+        error=None,
+        duplicate=True
+    )
+
+
+def _delete_vectors(pdf_id: str, chunk_count: int, namespaces: Iterable[str]) -> None:
+    """Delete a PDF's vectors by ID (no filter scan) from each namespace."""
+    index = _get_pinecone_index()
+    ids = [f"{pdf_id}_{i}" for i in range(chunk_count)]
+    for i in range(0, len(ids), 1000):
+        for namespace in namespaces:
+            index.delete(ids=ids[i:i + 1000], namespace=namespace)
+
+
+async def _save_or_adopt_duplicate(
+    summary: IngestionSummary,
+    chunks: Chunks,
+    content_hash: str,
+    start_time: float
+) -> IngestionSummary:
+    """
+    Save a freshly upserted PDF, or fall back to the copy that beat it.
+
+    Two concurrent uploads of the same file both pass the hash check; the
+    second insert then fails on idx_pdf_hash. Its vectors are removed and the
+    existing PDF is reported as a duplicate instead.
+    """
+    try:
+        await _save_to_database(summary.pdf_id, summary.filename, summary.category, chunks, content_hash)
+        return summary
+    except sqlite3.IntegrityError:
+        await asyncio.to_thread(_delete_vectors, summary.pdf_id, len(chunks), (summary.category,))
+        existing = await _find_pdf_by_hash(content_hash)
+        if existing is None:
+            raise
+        logger.info(f"Concurrent upload already stored {summary.filename} -> {existing[0]}")
+        return _duplicate_summary(existing, summary.filename, summary.category, start_time)
+
+
+async def _process_pdf(
+    file_path: str,
+    filename: str,
+    category: str,
+    content_hash: str,
+    start_time: float
+) -> tuple[IngestionSummary, Chunks | None]:
+    """
+    Run steps 1-5 of ingestion (everything except the database write).
+
+    Returns:
+        (summary, chunks) — chunks is None when identical content is already
+        ingested, in which case the summary points at the existing PDF.
+    """
+    # Step 0: Skip re-ingestion of identical content
+    existing = await _find_pdf_by_hash(content_hash)
+    if existing:
+        logger.info(f"PDF already ingested with identical content: {filename} -> {existing[0]}")
+        return _duplicate_summary(existing, filename, category, start_time), None
+
+    # Step 1: Extract text from PDF
+    pages, extraction_stats = await asyncio.to_thread(_extract_text_from_pdf, file_path)
+
+    if not pages:
+        raise PDFProcessingException(
+            "No extractable text found in PDF. "
+            "File may be scanned/image-only or empty."
+        )
+
+    # Step 2: Chunk text
+    chunks = _create_chunks_with_metadata(pages, filename, category)
+
+    if not chunks:
+        raise PDFProcessingException("Failed to create chunks from text")
+
+    # Step 3: Generate unique PDF ID
+    pdf_id = str(uuid.uuid4())
+
+    # Step 4-5: Generate embeddings and upsert to Pinecone, overlapped
+    logger.info(f"Embedding and upserting {len(chunks)} chunks...")
+    await _embed_and_upsert(pdf_id, chunks, filename, category)
+
+    return IngestionSummary(
+        pdf_id=pdf_id,
+        filename=filename,
+        category=category,
+        total_pages=extraction_stats["total_pages"],
+        pages_processed=extraction_stats["pages_processed"],
+        pages_skipped=extraction_stats["pages_skipped"],
+        total_chunks=len(chunks),
+        time_taken_seconds=0.0,  # filled in once the database write is done
+        success=True,
+        error=None
+    ), chunks
+
+
 async def ingest_pdf(
     file_path: str,
     filename: str,
@@ -383,61 +695,20 @@ async def ingest_pdf(
         PDFProcessingException: If ingestion fails
     """
     start_time = time.time()
-
-    # Validate category
-    if category not in VALID_CATEGORIES:
-        raise PDFProcessingException(
-            f"Invalid category '{category}'. Valid categories: {', '.join(sorted(VALID_CATEGORIES))}"
-        )
-
-    # Validate file exists
-    if not os.path.exists(file_path):
-        raise PDFProcessingException(f"File not found: {file_path}")
-
-    # Validate file size
-    size_mb = os.path.getsize(file_path) / (1024 * 1024)
-    if size_mb > MAX_FILE_MB:
-        raise PDFProcessingException(
-            f"File too large: {size_mb:.2f}MB (max: {MAX_FILE_MB}MB)"
-        )
+    size_mb = _validate_pdf(file_path, category)
 
     logger.info(f"Starting PDF ingestion: {filename} ({size_mb:.2f}MB, category: {category})")
 
     try:
-        # Step 1: Extract text from PDF
-        text, extraction_stats = _extract_text_from_pdf(file_path)
-
-        if not text or not text.strip():
-            raise PDFProcessingException(
-                "No extractable text found in PDF. "
-                "File may be scanned/image-only or empty."
-            )
-
-        # Step 2: Chunk text
-        chunks = _create_chunks_with_metadata(text, filename, category)
-
-        if not chunks:
-            raise PDFProcessingException("Failed to create chunks from text")
-
-        # Step 3: Generate embeddings
-        logger.info(f"Generating embeddings for {len(chunks)} chunks...")
-        chunk_texts = [chunk.chunk_text for chunk in chunks]
-        embeddings = await embed_texts(chunk_texts)
-
-        if len(embeddings) != len(chunks):
-            raise PDFProcessingException(
-                f"Embedding count mismatch: {len(embeddings)} embeddings for {len(chunks)} chunks"
-            )
-
-        # Step 4: Generate unique PDF ID
-        pdf_id = str(uuid.uuid4())
-
-        # Step 5: Upsert to Pinecone
-        logger.info(f"Upserting {len(chunks)} vectors to Pinecone...")
-        await _upsert_to_pinecone(pdf_id, chunks, embeddings, filename, category)
+        content_hash = await asyncio.to_thread(_hash_file, file_path)
+        summary, chunks = await _process_pdf(file_path, filename, category, content_hash, start_time)
+        if chunks is None:
+            return summary
 
         # Step 6: Save to database
-        await _save_to_database(pdf_id, filename, category, len(chunks))
+        summary = await _save_or_adopt_duplicate(summary, chunks, content_hash, start_time)
+        if summary.duplicate:
+            return summary
 
         # Calculate time taken
         time_taken = time.time() - start_time
@@ -447,18 +718,7 @@ async def ingest_pdf(
             f"{len(chunks)} chunks | {time_taken:.2f}s"
         )
 
-        return IngestionSummary(
-            pdf_id=pdf_id,
-            filename=filename,
-            category=category,
-            total_pages=extraction_stats["total_pages"],
-            pages_processed=extraction_stats["pages_processed"],
-            pages_skipped=extraction_stats["pages_skipped"],
-            total_chunks=len(chunks),
-            time_taken_seconds=round(time_taken, 2),
-            success=True,
-            error=None
-        )
+        return summary._replace(time_taken_seconds=round(time_taken, 2))
 
     except PDFProcessingException:
         # Re-raise PDF processing exceptions
@@ -470,6 +730,80 @@ async def ingest_pdf(
         raise PDFProcessingException(f"PDF ingestion failed: {str(e)}")
 
 
+async def ingest_pdfs_batch(files: list[tuple[str, str, str]]) -> list[IngestionSummary]:
+    """
+    Ingest several PDFs concurrently and record them in one database transaction.
+
+    Extraction, embedding and upserts run for up to MAX_CONCURRENT_INGESTS
+    files at a time; the pdf_library rows and chunk texts for every new PDF
+    are then written with executemany and a single commit.
+
+    Args:
+        files: (file_path, filename, category) tuples
+
+    Returns:
+        One IngestionSummary per input, in order; failed files have
+        success=False and the error message set.
+    """
+    start_time = time.time()
+    limit = asyncio.Semaphore(MAX_CONCURRENT_INGESTS)
+    seen_hashes: set[str] = set()
+
+    async def run(file_path: str, filename: str, category: str):
+        _validate_pdf(file_path, category)
+        content_hash = await asyncio.to_thread(_hash_file, file_path)
+        # Identical files in the same batch would collide on the unique hash index
+        if content_hash in seen_hashes:
+            raise PDFProcessingException("Duplicate of another file in this batch")
+        seen_hashes.add(content_hash)
+        async with limit:
+            summary, chunks = await _process_pdf(file_path, filename, category, content_hash, start_time)
+        return summary, chunks, content_hash
+
+    results = await asyncio.gather(*(run(*f) for f in files), return_exceptions=True)
+
+    summaries: list[IngestionSummary] = []
+    new_pdfs = []
+    for (file_path, filename, category), result in zip(files, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Batch ingestion failed for {filename}: {result}")
+            summaries.append(IngestionSummary(
+                pdf_id="", filename=filename, category=category,
+                total_pages=0, pages_processed=0, pages_skipped=0, total_chunks=0,
+                time_taken_seconds=0.0, success=False, error=str(result)
+            ))
+            continue
+        summary, chunks, content_hash = result
+        if chunks is not None:
+            new_pdfs.append((len(summaries), summary, chunks, content_hash))
+        summaries.append(summary)
+
+    if new_pdfs:
+        try:
+            async with write_transaction() as db:
+                await db.executemany(
+                    """INSERT INTO pdf_library (pdf_id, filename, category, chunk_count, status, content_hash)
+                       VALUES (?, ?, ?, ?, 'ACTIVE', ?)""",
+                    [
+                        (summary.pdf_id, summary.filename, summary.category, len(chunks), content_hash)
+                        for _, summary, chunks, content_hash in new_pdfs
+                    ]
+                )
+                for _, summary, chunks, _ in new_pdfs:
+                    await save_chunks(db, summary.pdf_id, chunks.texts)
+        except sqlite3.IntegrityError:
+            # A concurrent upload claimed one of these hashes; save one by one
+            for pos, summary, chunks, content_hash in new_pdfs:
+                summaries[pos] = await _save_or_adopt_duplicate(summary, chunks, content_hash, start_time)
+
+    time_taken = round(time.time() - start_time, 2)
+    logger.info(f"Batch ingestion complete: {len(new_pdfs)} new PDFs of {len(files)} | {time_taken:.2f}s")
+    return [
+        summary._replace(time_taken_seconds=time_taken) if summary.success and not summary.duplicate else summary
+        for summary in summaries
+    ]
+
+
 async def delete_pdf_from_index(pdf_id: str) -> bool:
     """
     Delete all vectors for a PDF from Pinecone and mark as deleted in database.
@@ -481,22 +815,32 @@ async def delete_pdf_from_index(pdf_id: str) -> bool:
         True if successful, False otherwise
     """
     try:
-        index = _get_pinecone_index()
+        db = await get_shared_db()
 
-        # Delete from Pinecone using metadata filter
-        index.delete(
-            filter={"pdf_id": {"$eq": pdf_id}},
-            namespace=PINECONE_NAMESPACE
+        cursor = await db.execute(
+            "SELECT category, chunk_count FROM pdf_library WHERE pdf_id = ?",
+            (pdf_id,)
         )
+        row = await cursor.fetchone()
+        if row:
+            # Delete by ID inside the category namespace (no filter scan);
+            # also clear the legacy namespace for PDFs ingested before the split
+            category, chunk_count = row
+            _delete_vectors(pdf_id, chunk_count, (category, LEGACY_NAMESPACE))
+        else:
+            _get_pinecone_index().delete(
+                filter={"pdf_id": {"$eq": pdf_id}},
+                namespace=LEGACY_NAMESPACE
+            )
         logger.info(f"Deleted PDF vectors from Pinecone: {pdf_id}")
 
         # Mark as deleted in database
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with write_transaction():
             await db.execute(
                 "UPDATE pdf_library SET status = 'DELETED' WHERE pdf_id = ?",
                 (pdf_id,)
             )
-            await db.commit()
+            await db.execute("DELETE FROM chunks WHERE pdf_id = ?", (pdf_id,))
 
         logger.info(f"Marked PDF as deleted in database: {pdf_id}")
         return True
@@ -513,13 +857,13 @@ async def list_pdfs() -> list[dict]:
     Returns:
         List of PDF metadata dictionaries
     """
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            """SELECT pdf_id, filename, category, chunk_count, status, upload_date
-               FROM pdf_library
-               WHERE status = 'ACTIVE'
-               ORDER BY upload_date DESC"""
-        )
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+    db = await get_shared_db()
+    cursor = await db.execute(
+        """SELECT pdf_id, filename, category, chunk_count, status, upload_date
+           FROM pdf_library
+           WHERE status = 'ACTIVE'
+           ORDER BY upload_date DESC"""
+    )
+    rows = await cursor.fetchall()
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in rows]
@@ -1,12 +1,16 @@
 """RAG query service for IVY AI Counsellor."""
 import os
+import asyncio
 import logging
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Sequence
 from anthropic import AsyncAnthropic
 from pinecone import Pinecone
 
 from app.utils.embedder import embed_text
-from app.utils.memory import get_history, add_message
+from app.utils.chunker import get_encoder
+from app.utils.memory import get_history_async, add_messages_async
+from app.models.database import get_db, get_chunk_texts
+from app.services.pdf_service import VALID_CATEGORIES, LEGACY_NAMESPACE
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +22,9 @@ PINECONE_INDEX = os.getenv("PINECONE_INDEX", "ivy-counsellor")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-5")
 RAG_TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("RAG_HISTORY_TOKEN_BUDGET", "4000"))
+SUMMARY_PREFIX = "[Previous conversation summary:"
+RAG_NAMESPACES = sorted(VALID_CATEGORIES) + [LEGACY_NAMESPACE]
 
 # System prompt for IVY AI Counsellor
 SYSTEM_PROMPT = """You are IVY AI Counsellor, a helpful study abroad advisor for IVY Overseas.
@@ -55,6 +62,58 @@ def get_anthropic_client() -> AsyncAnthropic:
     return _anthropic_client
 
 
+def trim_history_to_budget(
+    history: Sequence[dict[str, str]],
+    budget: int = HISTORY_TOKEN_BUDGET
+) -> Sequence[dict[str, str]]:
+    """
+    Drop the oldest turns until the history fits the token budget.
+
+    The summary message (if present) is always kept, and the kept turns
+    never start with an orphaned assistant reply.
+    """
+    if not history:
+        return history
+
+    enc = get_encoder()
+    head = history[:1] if history[0]["content"].startswith(SUMMARY_PREFIX) else history[:0]
+    turns = history[len(head):]
+    counts = [len(enc.encode_ordinary(m["content"])) for m in turns]
+
+    total = sum(len(enc.encode_ordinary(m["content"])) for m in head) + sum(counts)
+    start = 0
+    while start < len(turns) and total > budget:
+        total -= counts[start]
+        start += 1
+    # Don't open on an assistant reply whose question was dropped
+    while 0 < start < len(turns) and turns[start]["role"] != "user":
+        start += 1
+
+    return head + turns[start:]
+
+
+async def search_namespaces(
+    index,
+    query_vector: list[float],
+    top_k: int = RAG_TOP_K,
+    namespaces: list[str] = RAG_NAMESPACES
+) -> list:
+    """Query each category namespace in parallel and return the overall top_k matches."""
+    results = await asyncio.gather(*(
+        asyncio.to_thread(
+            index.query,
+            vector=query_vector,
+            top_k=top_k,
+            include_metadata=True,
+            namespace=namespace
+        )
+        for namespace in namespaces
+    ))
+    matches = [match for result in results for match in result.matches]
+    matches.sort(key=lambda m: m.score, reverse=True)
+    return matches[:top_k]
+
+
 # ─────────────────────────────────────────────────────────────
 # RAG Query Service
 # ─────────────────────────────────────────────────────────────
@@ -92,17 +151,21 @@ async def query_rag(
         pc = get_pinecone_client()
         index = pc.Index(PINECONE_INDEX)
         
-        search_results = index.query(
-            vector=query_vector,
-            top_k=RAG_TOP_K,
-            include_metadata=True,
-            namespace="ivy"
-        )
+        matches = await search_namespaces(index, query_vector)
         
+        # Fetch full chunk texts from SQLite in one round trip
+        chunk_keys = [
+            (match.metadata.get("pdf_id"), int(match.metadata.get("chunk_index", -1)))
+            for match in matches
+        ]
+        async with get_db() as conn:
+            stored_texts = await get_chunk_texts(conn, chunk_keys)
+
         # Extract chunks with similarity scores
         context_chunks = []
-        for match in search_results.matches:
-            chunk_text = match.metadata.get("text", "")
+        for match, key in zip(matches, chunk_keys):
+            # Older vectors (and JSONL ingests) carry the full text in metadata
+            chunk_text = stored_texts.get(key) or match.metadata.get("text", "")
             similarity_score = match.score  # Already 0.0 to 1.0
             context_chunks.append({
                 "text": chunk_text,
@@ -126,7 +189,7 @@ async def query_rag(
         # ─────────────────────────────────────────────────────
         # Step 4: Get conversation history
         # ─────────────────────────────────────────────────────
-        conversation_history = get_history(session_id)
+        conversation_history = trim_history_to_budget(await get_history_async(session_id))
         
         # ─────────────────────────────────────────────────────
         # Step 5: Build full prompt
@@ -194,8 +257,7 @@ Student question: {student_question}"""
         # ─────────────────────────────────────────────────────
         # Step 8: Store conversation in memory
         # ─────────────────────────────────────────────────────
-        add_message(session_id, "user", student_question)
-        add_message(session_id, "assistant", full_response)
+        await add_messages_async(session_id, [("user", student_question), ("assistant", full_response)])
         
     except Exception as e:
         logger.error(f"Error in RAG query service: {e}", exc_info=True)
@@ -1,15 +1,25 @@
 """Tiktoken-based text splitter for ... chunks."""
+import os
+import functools
+from array import array
 import tiktoken
 
 CHUNK_SIZE = 512
 CHUNK_OVERLAP = 50
+ENCODE_THREADS = os.cpu_count() or 1
 
 
+@functools.lru_cache(maxsize=4)
+def _get_encoding(name: str):
+    return tiktoken.get_encoding(name)
+
+
+@functools.lru_cache(maxsize=1)
 def get_encoder():
     try:
         return tiktoken.encoding_for_model("gpt-4")
     except Exception:
-        return tiktoken.get_encoding("cl100k_base")
+        return _get_encoding("cl100k_base")
 
 
 def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[str]:
@@ -18,44 +28,96 @@ def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVE
         return []
 
     enc = get_encoder()
-    chunks = []
+    chunks = []  # token lists, decoded together at the end
 
     # Split into paragraphs first to avoid encoding entire text at once
     paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
 
-    current_tokens = []
+    # Encode every paragraph in one call; tiktoken spreads the batch over threads
+    all_para_tokens = enc.encode_ordinary_batch(
+        [paragraph[:2000] for paragraph in paragraphs],  # cap per paragraph
+        num_threads=ENCODE_THREADS,
+    )
 
-    for paragraph in paragraphs:
-        # Encode one paragraph at a time (avoids MemoryError)
-        para_tokens = enc.encode(paragraph[:2000])  # cap per paragraph
+    current_tokens = []
 
+    for para_tokens in all_para_tokens:
         # If paragraph alone exceeds chunk size, split it directly
         if len(para_tokens) > chunk_size:
             # Flush current first
             if current_tokens:
-                chunks.append(enc.decode(current_tokens))
+                chunks.append(current_tokens)
                 current_tokens = current_tokens[-overlap:] if overlap else []
 
             # Split large paragraph
             start = 0
             while start < len(para_tokens):
                 end = min(start + chunk_size, len(para_tokens))
-                chunks.append(enc.decode(para_tokens[start:end]))
-                start = end - overlap
-                if start >= len(para_tokens):
+                chunks.append(para_tokens[start:end])
+                if end == len(para_tokens):
                     break
+                start = end - overlap
             continue
 
         # Adding paragraph exceeds chunk size — flush first
         if len(current_tokens) + len(para_tokens) > chunk_size:
             if current_tokens:
-                chunks.append(enc.decode(current_tokens))
+                chunks.append(current_tokens)
                 current_tokens = current_tokens[-overlap:] if overlap else []
 
         current_tokens.extend(para_tokens)
 
     # Flush remaining
     if current_tokens:
-        chunks.append(enc.decode(current_tokens))
+        chunks.append(current_tokens)
+
+    return [c for c in enc.decode_batch(chunks, num_threads=ENCODE_THREADS) if c.strip()]
+
+
+def chunk_pages(
+    pages: list[tuple[int, str]],
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP
+) -> list[tuple[str, int]]:
+    """Split page texts into overlapping token windows.
+
+    Page numbers travel in an array parallel to the token stream instead of
+    as "[Page N]" markers in the text, so chunks embed only document text.
+
+    Returns:
+        (chunk_text, page_number) pairs; page_number is the page of the
+        chunk's first token.
+    """
+    pages = [(page_number, text) for page_number, text in pages if text.strip()]
+    if not pages:
+        return []
+
+    enc = get_encoder()
+    separator = enc.encode_ordinary("\n\n")
+    all_page_tokens = enc.encode_ordinary_batch(
+        [text for _, text in pages], num_threads=ENCODE_THREADS
+    )
+
+    tokens: list[int] = []
+    page_ids = array("i")
+    for (page_number, _), page_tokens in zip(pages, all_page_tokens):
+        if tokens:
+            page_tokens = separator + page_tokens  # keep words from running across pages
+        tokens.extend(page_tokens)
+        page_ids.extend(array("i", [page_number]) * len(page_tokens))
+
+    step = max(chunk_size - overlap, 1)
+    windows = []
+    starts = []
+    for start in range(0, len(tokens), step):
+        end = min(start + chunk_size, len(tokens))
+        windows.append(tokens[start:end])
+        starts.append(start)
+        if end == len(tokens):
+            break
 
-    return [c for c in chunks if c.strip()]
\ No newline at end of file
+    return [
+        (chunk, page_ids[start])
+        for chunk, start in zip(enc.decode_batch(windows, num_threads=ENCODE_THREADS), starts)
+        if chunk.strip()
+    ]
@@ -1,11 +1,46 @@
 """OpenAI embedding wrapper for IVY AI Counsellor."""
 import os
+import asyncio
+import hashlib
+import logging
+import threading
+import weakref
+from array import array
 from dotenv import load_dotenv
 load_dotenv()
+import orjson
+import diskcache
+from cachetools import LRUCache
 from openai import AsyncOpenAI
 
+logger = logging.getLogger(__name__)
+
 MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+# Shortened output vectors (text-embedding-3 only); 0 keeps the model's full 1536.
+# Must match the Pinecone index dimension (see create_pinecone_index.py).
+DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))
+_DIMENSION_ARGS = {"dimensions": DIMENSIONS} if DIMENSIONS else {}
+# Persisted cache entries are only valid for the same model and size
+_CACHE_TAG = f"{MODEL}:{DIMENSIONS}" if DIMENSIONS else MODEL
+CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+SUB_BATCH_SIZE = 128  # texts per embeddings request
+MAX_CONCURRENT_REQUESTS = 5
+MAX_ATTEMPTS = 3
+# Optional file for warm starts; empty disables persistence
+CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+# Optional on-disk LRU shared by every process and ingest; empty disables it
+DISK_CACHE_DIR = os.getenv("EMBEDDING_DISK_CACHE_DIR", "")
+DISK_CACHE_MB = int(os.getenv("EMBEDDING_DISK_CACHE_MB", "1024"))
+
 _client: AsyncOpenAI | None = None
+# blake2b(text) digest -> embedding vector
+_cache: LRUCache = LRUCache(maxsize=CACHE_SIZE)
+# One request semaphore per event loop: a semaphore that has made a caller wait
+# is bound to that loop, and scripts may call asyncio.run more than once
+_request_limits: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_disk_cache: diskcache.Cache | None = None
+# Disk cache calls run on worker threads; only one of them may open it
+_disk_cache_lock = threading.Lock()
 
 
 def get_embedder_client() -> AsyncOpenAI:
@@ -18,18 +53,158 @@ def get_embedder_client() -> AsyncOpenAI:
     return _client
 
 
+def _get_request_limit() -> asyncio.Semaphore:
+    """Return the running loop's semaphore capping in-flight embedding requests."""
+    loop = asyncio.get_running_loop()
+    limit = _request_limits.get(loop)
+    if limit is None:
+        limit = _request_limits[loop] = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return limit
+
+
+def _cache_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _get_disk_cache() -> diskcache.Cache | None:
+    global _disk_cache
+    with _disk_cache_lock:
+        if _disk_cache is None and DISK_CACHE_DIR:
+            _disk_cache = diskcache.Cache(
+                DISK_CACHE_DIR,
+                size_limit=DISK_CACHE_MB * 1024 * 1024,
+                eviction_policy="least-recently-used",
+            )
+        return _disk_cache
+
+
+def configure_disk_cache(directory: str, size_mb: int = DISK_CACHE_MB) -> None:
+    """Use (or, with an empty directory, disable) the on-disk cache from now on."""
+    global DISK_CACHE_DIR, DISK_CACHE_MB, _disk_cache
+    with _disk_cache_lock:
+        if _disk_cache is not None:
+            _disk_cache.close()
+            _disk_cache = None
+        DISK_CACHE_DIR, DISK_CACHE_MB = directory, size_mb
+
+
+def _disk_key(key: bytes) -> bytes:
+    # Vectors from another model or dimension must never be returned
+    return _CACHE_TAG.encode() + b":" + key
+
+
+def _disk_lookup(keys: list[bytes], missing: list[int]) -> dict[int, list[float]]:
+    """Read the given indices from the disk cache; returns index -> vector for hits."""
+    disk = _get_disk_cache()
+    if disk is None:
+        return {}
+    found = {}
+    for i in missing:
+        raw = disk.get(_disk_key(keys[i]))
+        if raw is not None:
+            vector = array("f")
+            vector.frombytes(raw)
+            found[i] = vector.tolist()
+    return found
+
+
+def _disk_store(items: list[tuple[bytes, list[float]]]) -> None:
+    """Write new vectors to the disk cache as float32 bytes in one transaction."""
+    disk = _get_disk_cache()
+    if disk is None or not items:
+        return
+    with disk.transact():
+        for key, vector in items:
+            disk.set(_disk_key(key), array("f", vector).tobytes())
+
+
 async def embed_text(text: str) -> list[float]:
     """Embed a single text and return vector."""
+    key = _cache_key(text)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
     client = get_embedder_client()
-    r = await client.embeddings.create(input=[text], model=MODEL)
-    return r.data[0].embedding
+    r = await client.embeddings.create(input=[text], model=MODEL, **_DIMENSION_ARGS)
+    vector = r.data[0].embedding
+    _cache[key] = vector
+    return vector
+
+
+async def _embed_batch(client: AsyncOpenAI, texts: list[str]) -> list[list[float]]:
+    """Embed one sub-batch, retrying on its own; at most MAX_CONCURRENT_REQUESTS in flight."""
+    async with _get_request_limit():
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                r = await client.embeddings.create(input=texts, model=MODEL, **_DIMENSION_ARGS)
+                break
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                logger.warning("Embedding request attempt %d failed: %s, retrying...", attempt + 1, e)
+                await asyncio.sleep(2 ** attempt)
+    # The API normally returns embeddings in request order; sort on index so
+    # a reordered response can't pair a vector with the wrong text
+    data = r.data
+    if any(d.index != i for i, d in enumerate(data)):
+        data = sorted(data, key=lambda d: d.index)
+    if len(data) != len(texts):
+        raise ValueError(f"Expected {len(texts)} embeddings, got {len(data)}")
+    return [d.embedding for d in data]
 
 
 async def embed_texts(texts: list[str]) -> list[list[float]]:
-    """Embed multiple texts (batch)."""
+    """Embed multiple texts, sending cache misses to OpenAI in concurrent sub-batches."""
     if not texts:
         return []
-    client = get_embedder_client()
-    r = await client.embeddings.create(input=texts, model=MODEL)
-    by_idx = {d.index: d.embedding for d in r.data}
-    return [by_idx[i] for i in range(len(texts))]
+    keys = [_cache_key(t) for t in texts]
+    results = [_cache.get(k) for k in keys]
+    missing = [i for i, vector in enumerate(results) if vector is None]
+    # diskcache is synchronous SQLite (reads, writes, LRU eviction), so it
+    # runs on a worker thread; the in-memory LRU is only touched on the loop
+    if missing and DISK_CACHE_DIR:
+        found = await asyncio.to_thread(_disk_lookup, keys, missing)
+        for i, vector in found.items():
+            results[i] = vector
+            _cache[keys[i]] = vector
+        missing = [i for i in missing if i not in found]
+    if missing:
+        client = get_embedder_client()
+        shards = [missing[i:i + SUB_BATCH_SIZE] for i in range(0, len(missing), SUB_BATCH_SIZE)]
+        vectors = await asyncio.gather(*(
+            _embed_batch(client, [texts[i] for i in shard]) for shard in shards
+        ))
+        for shard, shard_vectors in zip(shards, vectors):
+            for i, vector in zip(shard, shard_vectors):
+                results[i] = vector
+                _cache[keys[i]] = vector
+        if DISK_CACHE_DIR:
+            await asyncio.to_thread(_disk_store, [(keys[i], results[i]) for i in missing])
+    return results
+
+
+def load_embedding_cache(path: str = CACHE_PATH) -> int:
+    """Load cached embeddings written by save_embedding_cache. Returns entries loaded."""
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read())
+    except Exception as e:
+        logger.warning("Could not load embedding cache: %s", e)
+        return 0
+    if data.get("model") != _CACHE_TAG:
+        return 0
+    for key, vector in data.get("entries", {}).items():
+        _cache[bytes.fromhex(key)] = vector
+    return len(_cache)
+
+
+def save_embedding_cache(path: str = CACHE_PATH) -> int:
+    """Persist cached embeddings to disk. Returns entries saved."""
+    if not path:
+        return 0
+    data = {"model": _CACHE_TAG, "entries": {k.hex(): v for k, v in _cache.items()}}
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(data))
+    return len(data["entries"])
@@ -1,46 +1,300 @@
 """Conversation memory manager with sliding window, summarization, and auto-expiry."""
 import os
 import time
+import heapq
+import hashlib
+import asyncio
 import logging
-from datetime import datetime, timedelta
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from itertools import chain
 from typing import Any, Optional
-from anthropic import Anthropic
+import httpx
+import orjson
+from cachetools import LRUCache
 
 logger = logging.getLogger(__name__)
 
 MAX_PAIRS = 10  # Keep last 10 message pairs (20 messages total)
 IDLE_EXPIRE_SECONDS = 30 * 60  # 30 minutes
+# In-process cap; the least recently active session is dropped beyond it
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "")  # set to share sessions across workers
 
-# In-process store: session_id -> { "messages": [...], "last_activity": timestamp, "summary": str }
-_sessions: dict[str, dict[str, Any]] = {}
+SUMMARY_MODEL = "claude-3-5-sonnet-20241022"
+SUMMARY_MAX_TOKENS = 200
+SUMMARY_PROMPT = """Summarize this conversation in 3 sentences, preserving key student details like scores, country interest, course preferences, and budget.
+
+Conversation:
+{conversation}
+
+Summary:"""
+# Stored in place of a summary when none could be produced
+SUMMARY_FAILED = "Previous conversation context (summarization failed)"
+SUMMARY_UNAVAILABLE = "Previous conversation context (summarization unavailable)"
+# Static text around the conversation, split once so prompts are plain concatenation
+_SUMMARY_PROMPT_HEAD, _, _SUMMARY_PROMPT_TAIL = SUMMARY_PROMPT.partition("{conversation}")
+# Prepended to the conversation when folding new messages into a summary
+PREVIOUS_SUMMARY_LINE = "EARLIER SUMMARY: {summary}\n"
+
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "1024"))
+# Once a session has a summary, evicted messages are held back until this
+# many have piled up and then folded into it with one call
+SUMMARY_DEBOUNCE_MESSAGES = int(os.getenv("SUMMARY_DEBOUNCE_MESSAGES", "8"))
+
+# Message Batches mode: queue summaries and submit them together every
+# SUMMARY_BATCH_INTERVAL seconds (half price, ready by a later turn)
+SUMMARY_BATCH_MODE = os.getenv("SUMMARY_BATCH_MODE", "false").lower() == "true"
+SUMMARY_BATCH_INTERVAL = int(os.getenv("SUMMARY_BATCH_INTERVAL", "30"))
+SUMMARY_BATCH_POLL_SECONDS = 10
+
+# Precomputed speaker labels for the summary transcript
+_ROLE_LABELS = {"user": "USER", "assistant": "ASSISTANT"}
+
+# Keep-alive pool shared by every summarization call on a manager
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=10)
+_HTTP_TIMEOUT = 30.0
+
+
+@dataclass(slots=True)
+class Message:
+    """One stored conversation message; slotted to keep long sessions small."""
+    role: str
+    content: str
+    timestamp: float  # epoch seconds
+    
+    # Dict-style reads for callers of get_session_info
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, key)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+
+def _has_running_loop() -> bool:
+    """True when called from inside a running asyncio event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+# In-process store: session_id -> { "messages": deque([...]), "last_activity": monotonic seconds, "summary": str }
+# "history" caches the formatted get_history list until messages or summary change;
+# "evicted" holds messages dropped from the window but not yet summarized
+# Ordered oldest to most recently active, so the LRU session is first
+_sessions: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+# Min-heap of (last_activity, session_id), pushed on every touch. Entries
+# superseded by later activity are skipped lazily when popped.
+_expiry_heap: list[tuple[float, str]] = []
+
+
+# Reset-ready session records recycled from cleared/expired sessions
+SESSION_POOL_SIZE = 256
+_session_pool: list[dict[str, Any]] = []
+
+
+def _new_session(now: float) -> dict[str, Any]:
+    """Fresh session record, reusing a pooled one when available."""
+    if _session_pool:
+        data = _session_pool.pop()
+        data["last_activity"] = now
+        return data
+    return {
+        "messages": deque(),
+        "last_activity": now,
+        "summary": None,
+        "pair_count": 0,
+        "history": None,
+        "evicted": []
+    }
+
+
+def _release_session(data: dict[str, Any]) -> None:
+    """Reset a dropped session record and return it to the pool."""
+    if len(_session_pool) < SESSION_POOL_SIZE:
+        data["messages"].clear()
+        data["summary"] = None
+        data["pair_count"] = 0
+        data["history"] = None
+        data["evicted"].clear()
+        _session_pool.append(data)
+
+
+class InMemorySessionStore:
+    """Process-local session store backed by the module-level ``_sessions`` dict."""
+    
+    # Plain dict operations; safe to call on the event loop
+    blocking_io = False
+    
+    def get(self, session_id: str) -> Optional[dict]:
+        return _sessions.get(session_id)
+    
+    def save(self, session_id: str, data: dict) -> None:
+        _sessions[session_id] = data
+        _sessions.move_to_end(session_id)
+        if len(_sessions) > MAX_SESSIONS:
+            _, evicted = _sessions.popitem(last=False)
+            _release_session(evicted)
+        heapq.heappush(_expiry_heap, (data["last_activity"], session_id))
+        # Keep superseded entries from piling up for very chatty sessions
+        if len(_expiry_heap) > 4 * len(_sessions) + 1024:
+            _expiry_heap[:] = [(d["last_activity"], sid) for sid, d in _sessions.items()]
+            heapq.heapify(_expiry_heap)
+    
+    def touch(self, session_id: str, data: dict) -> None:
+        """Record activity on a read; the record itself is already live."""
+        self.save(session_id, data)
+    
+    def set_summary(self, session_id: str, summary: str) -> None:
+        data = _sessions.get(session_id)
+        if data is not None:
+            data["summary"] = summary
+            data["history"] = None
+    
+    def delete(self, session_id: str) -> bool:
+        data = _sessions.pop(session_id, None)
+        if data is None:
+            return False
+        _release_session(data)
+        return True
+    
+    def count(self) -> int:
+        return len(_sessions)
+    
+    def expire_idle(self, cutoff: float) -> int:
+        """Drop sessions idle since before ``cutoff``; O(k log N) for k expired."""
+        expired = 0
+        while _expiry_heap and _expiry_heap[0][0] < cutoff:
+            _, sid = heapq.heappop(_expiry_heap)
+            data = _sessions.get(sid)
+            if data is not None and data["last_activity"] < cutoff:
+                del _sessions[sid]
+                _release_session(data)
+                expired += 1
+        return expired
+
+
+class RedisSessionStore:
+    """Session store shared by all workers; Redis TTL replaces the idle sweep.
+    
+    Each session is a hash at ``ivy:session:{session_id}`` whose key
+    expires after IDLE_EXPIRE_SECONDS without activity. Calls block on the
+    network, so async callers go through the manager's ``*_async`` methods.
+    """
+    
+    KEY_PREFIX = "ivy:session:"
+    blocking_io = True
+    
+    def __init__(self, url: str, ttl: int = IDLE_EXPIRE_SECONDS):
+        import redis  # only needed when REDIS_URL is configured
+        
+        self.redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+    
+    def _key(self, session_id: str) -> str:
+        return f"{self.KEY_PREFIX}{session_id}"
+    
+    def get(self, session_id: str) -> Optional[dict]:
+        raw = self.redis.hgetall(self._key(session_id))
+        if not raw:
+            return None
+        summary = raw.get(b"summary")
+        return {
+            "messages": deque(Message(**m) for m in orjson.loads(raw[b"messages"])),
+            "last_activity": float(raw[b"last_activity"]),
+            "summary": summary.decode() if summary else None,
+            "pair_count": int(raw[b"pair_count"]),
+            "evicted": [Message(**m) for m in orjson.loads(raw.get(b"evicted", b"[]"))]
+        }
+    
+    def save(self, session_id: str, data: dict) -> None:
+        key = self._key(session_id)
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping={
+            "messages": orjson.dumps(list(data["messages"])),
+            "last_activity": data["last_activity"],
+            "summary": data["summary"] or "",
+            "pair_count": data["pair_count"],
+            "evicted": orjson.dumps(data.get("evicted", []))
+        })
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+    
+    def touch(self, session_id: str, data: dict) -> None:
+        """Extend the idle TTL on a read without rewriting the hash."""
+        self.redis.expire(self._key(session_id), self.ttl)
+    
+    def set_summary(self, session_id: str, summary: str) -> None:
+        key = self._key(session_id)
+        if self.redis.exists(key):
+            self.redis.hset(key, "summary", summary)
+    
+    def delete(self, session_id: str) -> bool:
+        return bool(self.redis.delete(self._key(session_id)))
+    
+    def count(self) -> int:
+        return sum(1 for _ in self.redis.scan_iter(match=f"{self.KEY_PREFIX}*"))
+    
+    def expire_idle(self, cutoff: float) -> int:
+        return 0  # Redis expires idle keys itself
 
 
 class ConversationMemoryManager:
     """Manages conversation history with sliding window and summarization."""
     
-    def __init__(self, anthropic_api_key: Optional[str] = None):
+    def __init__(
+        self,
+        anthropic_api_key: Optional[str] = None,
+        store=None,
+        batch_mode: bool = SUMMARY_BATCH_MODE
+    ):
         """Initialize the memory manager.
         
         Args:
             anthropic_api_key: API key for Claude. If None, reads from ANTHROPIC_API_KEY env var.
+            store: Session store. Defaults to the in-process InMemorySessionStore.
+            batch_mode: Queue summaries for flush_summary_batch instead of calling the API per session.
         """
+        self.store = store or InMemorySessionStore()
+        self.batch_mode = batch_mode
+        # session_id -> evicted messages awaiting the next batch flush
+        self._batch_queue: dict[str, list[Message]] = {}
+        # sha256(prompt) -> summary; templated openings repeat across students
+        self._summary_cache: LRUCache = LRUCache(maxsize=SUMMARY_CACHE_SIZE)
+        # Background summarization state (per process, never persisted)
+        self._pending_tasks: dict[str, asyncio.Task] = {}
+        self._pending_old: dict[str, list[Message]] = {}
         self.api_key = anthropic_api_key or os.getenv("ANTHROPIC_API_KEY")
         if self.api_key:
-            self.client = Anthropic(api_key=self.api_key)
+            # only needed when summarization is enabled
+            from anthropic import Anthropic, AsyncAnthropic, DefaultHttpxClient, DefaultAsyncHttpxClient
+            
+            self.client = Anthropic(
+                api_key=self.api_key,
+                http_client=DefaultHttpxClient(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+            )
+            # Used when add_message runs inside an event loop (FastAPI requests)
+            self.async_client = AsyncAnthropic(
+                api_key=self.api_key,
+                http_client=DefaultAsyncHttpxClient(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+            )
         else:
             self.client = None
+            self.async_client = None
             logger.warning("No Anthropic API key provided. Summarization will be disabled.")
     
     def _ensure_session(self, session_id: str) -> dict:
         """Ensure session exists and update last activity timestamp."""
-        if session_id not in _sessions:
-            _sessions[session_id] = {
-                "messages": [],
-                "last_activity": time.time(),
-                "summary": None
-            }
-        _sessions[session_id]["last_activity"] = time.time()
-        return _sessions[session_id]
+        # Monotonic so clock adjustments can't expire or keep sessions wrongly
+        now = time.monotonic()
+        data = self.store.get(session_id)
+        if data is None:
+            data = _new_session(now)
+        data["last_activity"] = now
+        return data
     
     def add_message(self, session_id: str, role: str, content: str) -> None:
         """Add a new message to the conversation.
@@ -50,124 +304,287 @@ class ConversationMemoryManager:
             role: Either 'user' or 'assistant'
             content: Message content
         """
+        self.add_messages(session_id, [(role, content)])
+    
+    def add_messages(self, session_id: str, new_messages: list[tuple[str, str]]) -> None:
+        """Add several messages with one session load and one store write.
+        
+        Args:
+            session_id: Unique session identifier
+            new_messages: (role, content) pairs in conversation order
+        """
         data = self._ensure_session(session_id)
+        messages = data["messages"]
+        # One wall-clock read per batch, shared by every message in it
+        now = time.time()
         
-        # Add message with timestamp
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now()
-        }
-        data["messages"].append(message)
+        for role, content in new_messages:
+            # A pair is an assistant message directly following a user message
+            if role == "assistant" and messages and messages[-1].role == "user":
+                data["pair_count"] += 1
+            # Epoch timestamp (format with datetime.fromtimestamp when needed)
+            messages.append(Message(role, content, now))
         
         # Check if we need to apply sliding window
-        self._apply_sliding_window(session_id)
+        self._apply_sliding_window(session_id, data)
+        data["history"] = None
+        self.store.save(session_id, data)
     
-    def _apply_sliding_window(self, session_id: str) -> None:
+    def _apply_sliding_window(self, session_id: str, data: dict) -> None:
         """Apply sliding window logic: keep last 10 pairs, summarize older messages."""
-        data = _sessions[session_id]
         messages = data["messages"]
         
-        # Count message pairs (user + assistant = 1 pair)
-        # We need to count complete pairs
-        pair_count = 0
-        for i in range(len(messages) - 1):
-            if messages[i]["role"] == "user" and messages[i + 1]["role"] == "assistant":
-                pair_count += 1
-        
         # If we have more than MAX_PAIRS, summarize older messages
-        if pair_count > MAX_PAIRS:
-            # Find the split point: keep last MAX_PAIRS pairs (20 messages)
-            # We need to find where the last 10 pairs start
-            pairs_to_keep = MAX_PAIRS
-            messages_to_keep_count = pairs_to_keep * 2
-            
-            # Split messages
-            old_messages = messages[:-messages_to_keep_count]
-            recent_messages = messages[-messages_to_keep_count:]
+        if data["pair_count"] > MAX_PAIRS:
+            # Keep last MAX_PAIRS pairs (20 messages); evict the rest from the left
+            messages_to_keep_count = MAX_PAIRS * 2
+            old_messages = []
+            while len(messages) > messages_to_keep_count:
+                evicted = messages.popleft()
+                old_messages.append(evicted)
+                # Evicting a user message breaks the pair it started
+                if evicted.role == "user" and messages[0].role == "assistant":
+                    data["pair_count"] -= 1
             
             # Summarize old messages if we have a client
             if old_messages and self.client:
-                summary = self._summarize_conversation(old_messages)
-                data["summary"] = summary
+                # The first summary is written right away; later ones wait for
+                # enough evicted messages to be worth a call
+                evicted = data.setdefault("evicted", [])
+                evicted.extend(old_messages)
+                if data["summary"] is not None and len(evicted) < SUMMARY_DEBOUNCE_MESSAGES:
+                    return
+                old_messages = evicted[:]
+                evicted.clear()
+                if self.batch_mode:
+                    self._batch_queue.setdefault(session_id, []).extend(old_messages)
+                elif self.async_client and _has_running_loop():
+                    # Don't block the request; the summary lands before the next turn
+                    self._schedule_summary(session_id, old_messages)
+                else:
+                    summary = self._summarize_conversation(old_messages, data["summary"])
+                    data["summary"] = summary
+                    logger.info(f"Summarized {len(old_messages)} old messages for session {session_id}")
+    
+    def _schedule_summary(self, session_id: str, old_messages: list[Message]) -> None:
+        """Queue evicted messages for background summarization.
+        
+        Messages evicted while a summary is in flight are stashed and
+        picked up by the same task, so summaries never race each other.
+        """
+        self._pending_old.setdefault(session_id, []).extend(old_messages)
+        task = self._pending_tasks.get(session_id)
+        if task is None or task.done():
+            self._pending_tasks[session_id] = asyncio.get_running_loop().create_task(
+                self._drain_pending_summary(session_id)
+            )
+    
+    async def _drain_pending_summary(self, session_id: str) -> None:
+        """Summarize stashed messages until none are left."""
+        try:
+            while self._pending_old.get(session_id):
+                old_messages = self._pending_old.pop(session_id)
+                summary = await self._summarize_conversation_async(
+                    old_messages, self._current_summary(session_id)
+                )
+                self.store.set_summary(session_id, summary)
                 logger.info(f"Summarized {len(old_messages)} old messages for session {session_id}")
+        finally:
+            self._pending_tasks.pop(session_id, None)
+    
+    async def flush_summary_batch(self) -> int:
+        """Submit queued summaries as one Message Batch and store the results.
+        
+        Returns:
+            Number of summaries written back
+        """
+        if not self._batch_queue or not self.async_client:
+            return 0
+        queued, self._batch_queue = self._batch_queue, {}
+        written = 0
+        # custom_id is restricted to [a-zA-Z0-9_-]{1,64}, so map to positions
+        session_ids: list[str] = []
+        keys: list[str] = []
+        requests = []
+        for sid, old_messages in queued.items():
+            prompt = self._build_summary_prompt(old_messages, self._current_summary(sid))
+            key = self._summary_key(prompt)
+            cached = self._summary_cache.get(key)
+            if cached is not None:
+                self.store.set_summary(sid, cached)
+                written += 1
+                continue
+            requests.append({
+                "custom_id": f"s{len(session_ids)}",
+                "params": {
+                    "model": SUMMARY_MODEL,
+                    "max_tokens": SUMMARY_MAX_TOKENS,
+                    "messages": [{"role": "user", "content": prompt}]
+                }
+            })
+            session_ids.append(sid)
+            keys.append(key)
+        if not requests:
+            return written
+        
+        try:
+            batch = await self.async_client.messages.batches.create(requests=requests)
+            while batch.processing_status != "ended":
+                await asyncio.sleep(SUMMARY_BATCH_POLL_SECONDS)
+                batch = await self.async_client.messages.batches.retrieve(batch.id)
             
-            # Keep only recent messages
-            data["messages"] = recent_messages
+            async for entry in await self.async_client.messages.batches.results(batch.id):
+                pos = int(entry.custom_id[1:])
+                session_id = session_ids[pos]
+                if entry.result.type == "succeeded":
+                    summary = entry.result.message.content[0].text.strip()
+                    self._summary_cache[keys[pos]] = summary
+                else:
+                    logger.error(f"Batch summary {entry.result.type} for session {session_id}")
+                    summary = SUMMARY_FAILED
+                self.store.set_summary(session_id, summary)
+                written += 1
+        except Exception as e:
+            logger.error(f"Failed to run summary batch: {e}")
+            for session_id in session_ids:
+                self.store.set_summary(session_id, SUMMARY_FAILED)
+            return written
+        
+        logger.info(f"Summary batch {batch.id} wrote {written} summaries")
+        return written
+    
+    def _current_summary(self, session_id: str) -> Optional[str]:
+        """Summary stored for a session, if any, to merge new messages into."""
+        data = self.store.get(session_id)
+        return data["summary"] if data else None
     
-    def _summarize_conversation(self, messages: list[dict]) -> str:
+    @staticmethod
+    def _build_summary_prompt(messages: list[Message], previous: Optional[str] = None) -> str:
+        """Format messages, after any earlier summary, into the summarization prompt."""
+        conversation_text = "\n".join(
+            f"{_ROLE_LABELS.get(msg.role) or msg.role.upper()}: {msg.content}"
+            for msg in messages
+        )
+        # A placeholder carries nothing worth merging
+        if previous and previous not in (SUMMARY_FAILED, SUMMARY_UNAVAILABLE):
+            conversation_text = PREVIOUS_SUMMARY_LINE.format(summary=previous) + conversation_text
+        return _SUMMARY_PROMPT_HEAD + conversation_text + _SUMMARY_PROMPT_TAIL
+    
+    @staticmethod
+    def _summary_key(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    
+    def _summarize_conversation(self, messages: list[Message], previous: Optional[str] = None) -> str:
         """Summarize a list of messages using Claude API.
         
         Args:
-            messages: List of message dictionaries to summarize
+            messages: Messages to summarize
+            previous: Existing summary to merge the messages into
             
         Returns:
             Summary string
         """
         if not self.client:
-            return "Previous conversation context (summarization unavailable)"
+            return SUMMARY_UNAVAILABLE
         
-        # Format messages for summarization
-        conversation_text = "\n".join([
-            f"{msg['role'].upper()}: {msg['content']}"
-            for msg in messages
-        ])
-        
-        prompt = f"""Summarize this conversation in 3 sentences, preserving key student details like scores, country interest, course preferences, and budget.
-
-Conversation:
-{conversation_text}
-
-Summary:"""
+        prompt = self._build_summary_prompt(messages, previous)
+        key = self._summary_key(prompt)
+        cached = self._summary_cache.get(key)
+        if cached is not None:
+            return cached
         
         try:
             response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=200,
+                model=SUMMARY_MODEL,
+                max_tokens=SUMMARY_MAX_TOKENS,
                 messages=[{"role": "user", "content": prompt}]
             )
             summary = response.content[0].text.strip()
+            self._summary_cache[key] = summary
             return summary
         except Exception as e:
             logger.error(f"Failed to summarize conversation: {e}")
-            return "Previous conversation context (summarization failed)"
+            return SUMMARY_FAILED
     
-    def get_history(self, session_id: str) -> list[dict[str, str]]:
+    async def _summarize_conversation_async(self, messages: list[Message], previous: Optional[str] = None) -> str:
+        """Async variant of _summarize_conversation used by background tasks."""
+        if not self.async_client:
+            return SUMMARY_UNAVAILABLE
+        
+        prompt = self._build_summary_prompt(messages, previous)
+        key = self._summary_key(prompt)
+        cached = self._summary_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.async_client.messages.create(
+                model=SUMMARY_MODEL,
+                max_tokens=SUMMARY_MAX_TOKENS,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            summary = response.content[0].text.strip()
+            self._summary_cache[key] = summary
+            return summary
+        except Exception as e:
+            logger.error(f"Failed to summarize conversation: {e}")
+            return SUMMARY_FAILED
+    
+    def get_history(self, session_id: str) -> tuple[dict[str, str], ...]:
         """Get formatted message history for Claude API.
         
         Args:
             session_id: Unique session identifier
             
         Returns:
-            List of messages formatted for Claude API (role and content only)
+            Read-only sequence of messages formatted for Claude API (role and content only)
         """
         data = self._ensure_session(session_id)
-        result = []
-        
-        # Add summary as a system-like message if it exists
-        if data.get("summary"):
-            result.append({
-                "role": "user",
-                "content": f"[Previous conversation summary: {data['summary']}]"
-            })
-        
-        # Add recent messages (without timestamp for API compatibility)
-        for msg in data["messages"]:
-            result.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
+        self.store.touch(session_id, data)
+        result = data.get("history")
+        if result is None:
+            result = []
+            
+            # Add summary as a system-like message if it exists
+            if data.get("summary"):
+                result.append({
+                    "role": "user",
+                    "content": f"[Previous conversation summary: {data['summary']}]"
+                })
+            
+            # Add evicted messages still awaiting summary, then recent messages
+            # (without timestamp for API compatibility)
+            for msg in chain(data.get("evicted", ()), data["messages"]):
+                result.append({
+                    "role": msg.role,
+                    "content": msg.content
+                })
+            # Immutable, so the cached history is handed out without copying
+            result = tuple(result)
+            data["history"] = result
         
         return result
     
+    async def get_history_async(self, session_id: str) -> tuple[dict[str, str], ...]:
+        """get_history for async callers; network-backed stores run in a thread."""
+        if self.store.blocking_io:
+            return await asyncio.to_thread(self.get_history, session_id)
+        return self.get_history(session_id)
+    
+    async def add_messages_async(self, session_id: str, new_messages: list[tuple[str, str]]) -> None:
+        """add_messages for async callers; network-backed stores run in a thread."""
+        if self.store.blocking_io:
+            await asyncio.to_thread(self.add_messages, session_id, new_messages)
+        else:
+            self.add_messages(session_id, new_messages)
+    
     def clear_session(self, session_id: str) -> None:
         """Remove session data.
         
         Args:
             session_id: Unique session identifier
         """
-        if session_id in _sessions:
-            del _sessions[session_id]
+        if self.store.delete(session_id):
             logger.info(f"Cleared session: {session_id}")
     
     def expire_idle_sessions(self) -> int:
@@ -176,23 +593,16 @@ Summary:"""
         Returns:
             Number of sessions expired
         """
-        now = time.time()
-        to_delete = [
-            sid for sid, data in _sessions.items()
-            if now - data["last_activity"] > IDLE_EXPIRE_SECONDS
-        ]
-        
-        for sid in to_delete:
-            del _sessions[sid]
+        expired = self.store.expire_idle(time.monotonic() - IDLE_EXPIRE_SECONDS)
         
-        if to_delete:
-            logger.info(f"Expired {len(to_delete)} idle sessions")
+        if expired:
+            logger.info(f"Expired {expired} idle sessions")
         
-        return len(to_delete)
+        return expired
     
     def get_session_count(self) -> int:
         """Get the number of active sessions."""
-        return len(_sessions)
+        return self.store.count()
     
     def get_session_info(self, session_id: str) -> Optional[dict]:
         """Get session information for debugging/testing.
@@ -203,7 +613,7 @@ Summary:"""
         Returns:
             Session data or None if session doesn't exist
         """
-        return _sessions.get(session_id)
+        return self.store.get(session_id)
 
 
 # Global instance for easy access
@@ -214,7 +624,8 @@ def get_memory_manager() -> ConversationMemoryManager:
     """Get or create the global memory manager instance."""
     global _manager
     if _manager is None:
-        _manager = ConversationMemoryManager()
+        store = RedisSessionStore(REDIS_URL) if REDIS_URL else InMemorySessionStore()
+        _manager = ConversationMemoryManager(store=store)
     return _manager
 
 
@@ -224,11 +635,26 @@ def add_message(session_id: str, role: str, content: str) -> None:
     get_memory_manager().add_message(session_id, role, content)
 
 
-def get_history(session_id: str) -> list[dict[str, str]]:
+def add_messages(session_id: str, messages: list[tuple[str, str]]) -> None:
+    """Add several (role, content) messages in one store round-trip."""
+    get_memory_manager().add_messages(session_id, messages)
+
+
+def get_history(session_id: str) -> tuple[dict[str, str], ...]:
     """Get formatted message history for Claude API."""
     return get_memory_manager().get_history(session_id)
 
 
+async def get_history_async(session_id: str) -> tuple[dict[str, str], ...]:
+    """Get formatted message history without blocking the event loop."""
+    return await get_memory_manager().get_history_async(session_id)
+
+
+async def add_messages_async(session_id: str, messages: list[tuple[str, str]]) -> None:
+    """Add several messages without blocking the event loop."""
+    await get_memory_manager().add_messages_async(session_id, messages)
+
+
 def clear_session(session_id: str) -> None:
     """Remove session data."""
     get_memory_manager().clear_session(session_id)
@@ -237,3 +663,8 @@ def clear_session(session_id: str) -> None:
 def expire_idle_sessions() -> int:
     """Remove idle sessions and return count of expired sessions."""
     return get_memory_manager().expire_idle_sessions()
+
+
+async def flush_summary_batch() -> int:
+    """Submit queued summaries as one Message Batch (scheduled in batch mode)."""
+    return await get_memory_manager().flush_summary_batch()
@@ -8,6 +8,8 @@ load_dotenv()
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX = os.getenv("PINECONE_INDEX", "ivy-counsellor")
+# Match app/utils/embedder.py: EMBEDDING_DIMENSIONS shortens text-embedding-3 vectors
+DIMENSION = int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or 1536
 
 if not PINECONE_API_KEY:
     print("ERROR: PINECONE_API_KEY not found in environment")
@@ -26,9 +28,9 @@ if PINECONE_INDEX in existing_indexes:
     exit(0)
 
 # Create the index
-# OpenAI text-embedding-3-small produces 1536-dimensional vectors
+# OpenAI text-embedding-3-small produces 1536-dimensional vectors unless shortened
 print(f"\nCreating index '{PINECONE_INDEX}'...")
-print("  - Dimension: 1536 (OpenAI text-embedding-3-small)")
+print(f"  - Dimension: {DIMENSION} (OpenAI text-embedding-3-small)")
 print("  - Metric: cosine")
 print("  - Cloud: AWS")
 print("  - Region: us-east-1")
@@ -36,7 +38,7 @@ print("  - Region: us-east-1")
 try:
     pc.create_index(
         name=PINECONE_INDEX,
-        dimension=1536,  # OpenAI text-embedding-3-small dimension
+        dimension=DIMENSION,  # OpenAI text-embedding-3-small dimension
         metric="cosine",
         spec=ServerlessSpec(
             cloud="aws",
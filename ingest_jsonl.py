@@ -1,45 +1,90 @@
 """Ingest JSONL conversation data into Pinecone."""
 import asyncio
+import functools
+import mmap
 import sys
 import os
-import json
+import re
+import time
 import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import count, islice
+from typing import Iterator
 sys.path.append(".")
 
 from dotenv import load_dotenv
 load_dotenv()
 
+import orjson
 from pinecone import Pinecone
-from app.utils.embedder import embed_texts
-from app.models.database import init_db, DB_PATH
-import aiosqlite
+from app.utils.embedder import configure_disk_cache, embed_texts
+from app.models.database import init_db, write_transaction, close_shared_db
 
 # ── Config ────────────────────────────────────────────────
 JSONL_FILE = "data/jsonl/StudyAbroadGPT-Dataset.jsonl"   # ← your file path
 CATEGORY = "sop"                                # ← change per file
 COUNTRY = "All"                                 # ← change per file
 LAST_UPDATED = "2026-02-28"
-PINECONE_NAMESPACE = "ivy"
 BATCH_SIZE = 50
+UPSERT_BATCH_SIZE = 100
+UPSERT_THREADS = 30  # concurrent Pinecone batch upserts
+EXTRACT_CHUNKSIZE = 64  # records per task sent to extraction workers
+EXTRACT_IN_FLIGHT = 2 * (os.cpu_count() or 1)  # tasks queued before reading more records
+# Re-ingesting a file (new category, retry after a crash) reuses embeddings
+# from the embedder's on-disk cache instead of paying for them again
+DISK_CACHE_DIR = os.getenv("EMBEDDING_DISK_CACHE_DIR") or "data/embedding_cache"
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX = os.getenv("PINECONE_INDEX", "ivy-counsellor")
+MAX_CHUNK_CHARS = 2000
+# Set VERIFY_UPLOAD=1 to poll Pinecone stats after each file
+VERIFY_UPLOAD = os.getenv("VERIFY_UPLOAD", "").lower() in ("1", "true", "yes")
 # ─────────────────────────────────────────────────────────
 
+_MD_RE = re.compile(r"[#*]+")  # markdown headings and emphasis
+_WS_RE = re.compile(r"\s+")
 
-def load_jsonl(file_path: str) -> list[dict]:
-    """Load all records from JSONL file."""
-    records = []
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line_num, line in enumerate(f, 1):
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                records.append(json.loads(line))
-            except json.JSONDecodeError as e:
-                print(f"  Skipping line {line_num} — invalid JSON: {e}")
-    return records
+
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (RFC 9562 version 7): 48-bit ms timestamp, then random bits."""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # version 7
+    value = value & ~(0x3 << 62) | 0x2 << 62  # RFC 4122 variant
+    return uuid.UUID(int=value)
+
+
+def _iter_lines(file_path: str) -> Iterator[bytes]:
+    """Yield each line of a file as bytes, scanning a read-only mmap for newlines."""
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return  # mmap rejects empty files
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start, size = 0, len(mm)
+            while start < size:
+                end = mm.find(b"\n", start)
+                if end == -1:
+                    end = size  # last line without a trailing newline
+                yield mm[start:end]
+                start = end + 1
+
+
+def iter_jsonl(file_path: str) -> Iterator[dict]:
+    """Yield records from a JSONL file one line at a time."""
+    # orjson parses the raw bytes, so lines are never decoded to str first;
+    # the OS pages the mapped file in and out, so memory stays flat
+    for line_num, line in enumerate(_iter_lines(file_path), 1):
+        line = line.strip()
+        if not line:
+            continue
+        # Records are objects; reject truncated/garbage lines without parsing
+        if line[:1] != b"{" or line[-1:] != b"}":
+            print(f"  Skipping line {line_num} — not a JSON object")
+            continue
+        try:
+            yield orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            print(f"  Skipping line {line_num} — invalid JSON: {e}")
 
 
 def extract_chunks_from_record(record: dict) -> list[dict]:
@@ -77,16 +122,16 @@ def extract_chunks_from_record(record: dict) -> list[dict]:
             answer = assistant_msg.get("value", "").strip()
             
             if question and answer:
-                # Clean markdown from answer for better embedding
-                clean_answer = answer.replace("##", "").replace("**", "").replace("*", "").replace("#", "")
-                clean_answer = " ".join(clean_answer.split())  # normalize whitespace
+                # Clean markdown from answer for better embedding; anything
+                # past MAX_CHUNK_CHARS is cut below, so don't clean it
+                clean_answer = _WS_RE.sub(" ", _MD_RE.sub("", answer[:MAX_CHUNK_CHARS])).strip()
                 
                 # Combine Q+A as single chunk (better for retrieval)
                 combined = f"Question: {question}\n\nAnswer: {clean_answer}"
                 
                 # Truncate to ~2000 chars to avoid token limits
-                if len(combined) > 2000:
-                    combined = combined[:2000] + "..."
+                if len(combined) > MAX_CHUNK_CHARS or len(answer) > MAX_CHUNK_CHARS:
+                    combined = combined[:MAX_CHUNK_CHARS] + "..."
                 
                 chunks.append({
                     "text": combined,
@@ -101,13 +146,35 @@ def extract_chunks_from_record(record: dict) -> list[dict]:
     return chunks
 
 
+def extract_chunks_from_records(records: list[dict]) -> list[dict]:
+    """Extract chunks from a batch of records (one extraction worker task)."""
+    return [chunk for record in records for chunk in extract_chunks_from_record(record)]
+
+
+def chunks(iterable, batch_size: int = UPSERT_BATCH_SIZE):
+    """Yield successive lists of at most batch_size items."""
+    it = iter(iterable)
+    while batch := list(islice(it, batch_size)):
+        yield batch
+
+
+def _namespace_count(stats, namespace: str) -> int:
+    """Vector count of one namespace from describe_index_stats()."""
+    return stats.get("namespaces", {}).get(namespace, {}).get("vector_count", 0)
+
+
 async def ingest_jsonl(
     file_path: str,
     category: str,
     country: str,
     last_updated: str
-):
-    """Main ingestion function."""
+) -> tuple[str, str, str, int] | None:
+    """
+    Main ingestion function.
+
+    Returns the (pdf_id, filename, category, chunk_count) row for pdf_library,
+    or None if nothing was ingested; main() saves all rows in one transaction.
+    """
     
     print(f"\n{'='*50}")
     print(f"File:     {file_path}")
@@ -120,130 +187,200 @@ async def ingest_jsonl(
         print(f"ERROR: File not found: {file_path}")
         return
     
-    # Load JSONL
-    print("Loading JSONL file...")
-    records = load_jsonl(file_path)
-    print(f"Loaded {len(records)} records")
-    
-    # Extract all chunks
+    # Stream records straight into chunk extraction (no full record list);
+    # records are cleaned in worker processes, EXTRACT_CHUNKSIZE at a time
     print("Extracting Q&A chunks...")
+    record_count = 0
+
+    def counted(records: Iterator[dict]) -> Iterator[dict]:
+        nonlocal record_count
+        for record in records:
+            record_count += 1
+            yield record
+
+    # Executor.map would read and submit every record up front; at most
+    # EXTRACT_IN_FLIGHT tasks are queued here, collected in file order
     all_chunks = []
-    for record in records:
-        chunks = extract_chunks_from_record(record)
-        all_chunks.extend(chunks)
+    pending: deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        for records in chunks(counted(iter_jsonl(file_path)), EXTRACT_CHUNKSIZE):
+            if len(pending) >= EXTRACT_IN_FLIGHT:
+                all_chunks.extend(pending.popleft().result())
+            pending.append(ex.submit(extract_chunks_from_records, records))
+        while pending:
+            all_chunks.extend(pending.popleft().result())
     
-    print(f"Extracted {len(all_chunks)} chunks")
+    print(f"Extracted {len(all_chunks)} chunks from {record_count} records")
     
     if not all_chunks:
         print("ERROR: No chunks extracted. Check your JSONL format.")
         return
     
     # Generate PDF/batch ID
-    batch_id = str(uuid.uuid4())
+    batch_id = str(uuid7())
     filename = os.path.basename(file_path)
     
-    # Embed in batches
-    print(f"\nEmbedding {len(all_chunks)} chunks...")
-    texts = [c["text"] for c in all_chunks]
-    
-    all_embeddings = []
-    for i in range(0, len(texts), BATCH_SIZE):
-        batch_texts = texts[i:i + BATCH_SIZE]
-        batch_embeddings = await embed_texts(batch_texts)
-        all_embeddings.extend(batch_embeddings)
-        print(f"  Embedded {min(i + BATCH_SIZE, len(texts))}/{len(texts)}")
-    
-    print(f"Embeddings done ✅")
-    
-    # Upsert to Pinecone
-    print(f"\nUpserting to Pinecone...")
+    # Embed and upsert as one pipeline: each batch is upserted as soon as
+    # its embeddings arrive, while later batches are still embedding
+    print(f"\nEmbedding and upserting {len(all_chunks)} chunks...")
     pc = Pinecone(api_key=PINECONE_API_KEY)
-    index = pc.Index(PINECONE_INDEX)
-    
-    vectors = []
-    for i, (chunk, embedding) in enumerate(zip(all_chunks, all_embeddings)):
-        vectors.append({
-            "id": f"{batch_id}_{i}",
-            "values": embedding,
-            "metadata": {
-                "pdf_id": batch_id,
-                "source_pdf": filename,
-                "category": category,
-                "country": country,
-                "sub_category": category.title(),
-                "audience": "Both",
-                "last_updated": last_updated,
-                "chunk_index": i,
-                "text": chunk["text"],
-                "text_preview": chunk["text_preview"],
-                "question": chunk["question"],
-            }
-        })
+    # One pooled connection per upsert thread
+    index = pc.Index(PINECONE_INDEX, pool_threads=UPSERT_THREADS)
+    loop = asyncio.get_running_loop()
+    if VERIFY_UPLOAD:
+        baseline = _namespace_count(await asyncio.to_thread(index.describe_index_stats), category)
     
-    # Upsert in batches of 100
-    for i in range(0, len(vectors), 100):
-        batch = vectors[i:i + 100]
-        index.upsert(vectors=batch, namespace=PINECONE_NAMESPACE)
-        print(f"  Upserted {min(i + 100, len(vectors))}/{len(vectors)}")
-    
-    print(f"Pinecone upsert done ✅")
+    # Fields shared by every vector are built once and merged per chunk
+    base_meta = {
+        "pdf_id": batch_id,
+        "source_pdf": filename,
+        "category": category,
+        "country": country,
+        "sub_category": category.title(),
+        "audience": "Both",
+        "last_updated": last_updated,
+    }
+    embedded = upserted = 0
+
+    async def embed_and_upsert(start: int, batch: list[dict], pool: ThreadPoolExecutor) -> None:
+        nonlocal embedded, upserted
+        # embed_texts caps in-flight requests and retries failed ones itself
+        embeddings = await embed_texts([c["text"] for c in batch])
+        embedded += len(batch)
+        print(f"  Embedded {embedded}/{len(all_chunks)}")
+
+        vectors = [
+            {
+                "id": f"{batch_id}_{i}",
+                "values": embedding,
+                "metadata": {
+                    **base_meta,
+                    "chunk_index": i,
+                    "text": chunk["text"],
+                    "text_preview": chunk["text_preview"],
+                    "question": chunk["question"],
+                }
+            }
+            for i, chunk, embedding in zip(count(start), batch, embeddings)
+        ]
+        # Pinecone calls block, so they run on the upsert threads; wait for
+        # all of them even if one fails so none lands after the cleanup
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, functools.partial(index.upsert, vectors=v, namespace=category))
+            for v in chunks(vectors)
+        ), return_exceptions=True)
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
+        upserted += len(vectors)
+        print(f"  Upserted {upserted}/{len(all_chunks)}")
+
+    with ThreadPoolExecutor(max_workers=UPSERT_THREADS) as pool:
+        # Let every batch finish before deciding, so nothing is still
+        # upserting while a failed file's vectors are being removed
+        results = await asyncio.gather(*(
+            embed_and_upsert(i, all_chunks[i:i + BATCH_SIZE], pool)
+            for i in range(0, len(all_chunks), BATCH_SIZE)
+        ), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            # The file gets no pdf_library row, so any vectors it did write
+            # would be orphans; IDs that were never written delete as no-ops
+            print(f"ERROR: {len(errors)} batch(es) failed, removing {batch_id} vectors...")
+            ids = [f"{batch_id}_{i}" for i in range(len(all_chunks))]
+            await asyncio.gather(*(
+                loop.run_in_executor(pool, functools.partial(index.delete, ids=batch, namespace=category))
+                for batch in chunks(ids, 1000)
+            ))
+            raise errors[0]
     
-    # Save to SQLite database
-    print(f"\nSaving to database...")
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            """INSERT OR IGNORE INTO pdf_library 
-               (pdf_id, filename, category, chunk_count, status)
-               VALUES (?, ?, ?, ?, 'ACTIVE')""",
-            (batch_id, filename, category, len(all_chunks))
-        )
-        await db.commit()
-    print(f"Database saved ✅")
+    print(f"Embedding and Pinecone upsert done ✅")
     
     # Final summary
     print(f"\n{'='*50}")
     print(f"INGESTION COMPLETE ✅")
     print(f"File:      {filename}")
-    print(f"Records:   {len(records)}")
+    print(f"Records:   {record_count}")
     print(f"Chunks:    {len(all_chunks)}")
     print(f"Batch ID:  {batch_id}")
     print(f"{'='*50}\n")
     
-    # Verify
-    import time
-    time.sleep(3)
-    stats = index.describe_index_stats()
-    print(f"Pinecone total vectors: {stats.get('total_vector_count', 0)}")
-    print(f"Namespaces: {stats.get('namespaces', {})}")
+    # Optional: wait (with backoff) until Pinecone's stats reflect the upload
+    if VERIFY_UPLOAD:
+        expected = baseline + len(all_chunks)
+        for delay in (0.5, 1, 2, 4):
+            await asyncio.sleep(delay)
+            stats = await asyncio.to_thread(index.describe_index_stats)
+            if _namespace_count(stats, category) >= expected:
+                break
+        print(f"Pinecone total vectors: {stats.get('total_vector_count', 0)}")
+        print(f"Namespaces: {stats.get('namespaces', {})}")
+
+    return batch_id, filename, category, len(all_chunks)
+
+
+async def save_to_database(rows: list[tuple[str, str, str, int]]) -> None:
+    """Insert pdf_library rows for every ingested file in a single transaction."""
+    if not rows:
+        return
+    print(f"\nSaving {len(rows)} file(s) to database...")
+    # Shared connection: WAL with synchronous=NORMAL; rolled back on failure
+    async with write_transaction() as db:
+        await db.executemany(
+            """INSERT OR IGNORE INTO pdf_library 
+               (pdf_id, filename, category, chunk_count, status)
+               VALUES (?, ?, ?, ?, 'ACTIVE')""",
+            rows
+        )
+    print(f"Database saved ✅")
+
+
+# ── Add your JSONL files here ─────────────────────
+FILES = [
+    {
+        "file_path": JSONL_FILE,
+        "category": CATEGORY,
+        "country": COUNTRY,
+        "last_updated": LAST_UPDATED,
+    },
+    # Add more files:
+    # {
+    #     "file_path": "data/jsonl/uk_visa.jsonl",
+    #     "category": "visa",
+    #     "country": "UK",
+    #     "last_updated": "2026-02-28",
+    # },
+]
+# ─────────────────────────────────────────────────
 
 
 async def main():
+    configure_disk_cache(DISK_CACHE_DIR)
     await init_db()
-    
-    # ── Add your JSONL files here ─────────────────────
-    files = [
-        {
-            "file_path": JSONL_FILE,
-            "category": CATEGORY,
-            "country": COUNTRY,
-            "last_updated": LAST_UPDATED,
-        },
-        # Add more files:
-        # {
-        #     "file_path": "data/jsonl/uk_visa.jsonl",
-        #     "category": "visa",
-        #     "country": "UK",
-        #     "last_updated": "2026-02-28",
-        # },
-    ]
-    # ─────────────────────────────────────────────────
-    
-    for f in files:
-        await ingest_jsonl(
-            file_path=f["file_path"],
-            category=f["category"],
-            country=f["country"],
-            last_updated=f["last_updated"],
-        )
 
-asyncio.run(main())
\ No newline at end of file
+    rows = []
+    try:
+        for f in FILES:
+            row = await ingest_jsonl(
+                file_path=f["file_path"],
+                category=f["category"],
+                country=f["country"],
+                last_updated=f["last_updated"],
+            )
+            if row is not None:
+                rows.append(row)
+    finally:
+        # Files ingested before a failure still get their rows
+        try:
+            await save_to_database(rows)
+        finally:
+            await close_shared_db()
+
+
+# Guarded so extraction worker processes can import this module safely
+if __name__ == "__main__":
+    # Check inputs before paying for the event loop and DB initialisation
+    missing = [f["file_path"] for f in FILES if not os.path.exists(f["file_path"])]
+    if missing:
+        sys.exit(f"ERROR: File not found: {', '.join(missing)}")
+    asyncio.run(main())
@@ -5,30 +5,47 @@ This is the main application file that initializes FastAPI, sets up middleware,
 includes routers, and handles application lifecycle events.
 """
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Callable
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
+import hashlib
+import inspect
 import logging
 import os
+import orjson
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from app.models.database import init_db
+from app.config.logging import setup_logging, stop_logging
+from app.models.database import init_db, get_shared_db, close_shared_db
+from app.utils.embedder import load_embedding_cache, save_embedding_cache
+from app.utils.memory import (
+    get_memory_manager, expire_idle_sessions, flush_summary_batch,
+    SUMMARY_BATCH_MODE, SUMMARY_BATCH_INTERVAL,
+)
 from app.routes.chat import router as chat_router
 from app.routes.admin import router as admin_router
-from app.services.gap_report_service import schedule_gap_report
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from app.services.gap_report_service import run_weekly_gap_report
+from app.services.pdf_service import start_pools, shutdown_pools
 
 # ── Logging ───────────────────────────────────────────────────────────────────
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
-# ── Scheduler (global so it can be stopped on shutdown) ───────────────────────
-scheduler = AsyncIOScheduler()
+# ── Background jobs ───────────────────────────────────────────────────────────
+async def _run_every(seconds: float, job: Callable) -> None:
+    """Call job (sync or async) every `seconds` until cancelled; errors are logged."""
+    while True:
+        await asyncio.sleep(seconds)
+        try:
+            result = job()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error("Background job %s failed: %s", job.__name__, e)
 
 
 # ── Lifespan ──────────────────────────────────────────────────────────────────
@@ -45,18 +62,38 @@ async def lifespan(app: FastAPI):
     # 1. Database
     try:
         await init_db()
+        # Open the long-lived connection every get_db() block shares
+        app.state.db = await get_shared_db()
         logger.info("Database initialised ✅")
     except Exception as e:
         logger.error("Database init failed: %s", e)
         raise
 
-    # 2. APScheduler — weekly gap report every Monday 9 AM IST
+    # Conversation memory — build the shared manager (and its Anthropic
+    # clients) now so the first chat request doesn't pay for it
+    get_memory_manager()
+
+    # PDF page-extraction pool, created here on the main thread (workers spawn)
+    start_pools()
+
+    # 2. Embedding cache (warm start)
     try:
-        schedule_gap_report(scheduler)
-        scheduler.start()
-        logger.info("Scheduler started ✅")
+        loaded = load_embedding_cache()
+        if loaded:
+            logger.info("Embedding cache loaded: %d entries ✅", loaded)
     except Exception as e:
-        logger.error("Scheduler failed to start: %s", e)
+        logger.warning("Embedding cache load failed: %s", e)
+
+    # 3. Background tasks — weekly gap report every Monday 9 AM IST,
+    #    idle conversation sweep every minute, summary batches when enabled
+    jobs = [
+        asyncio.create_task(run_weekly_gap_report()),
+        asyncio.create_task(_run_every(60, expire_idle_sessions)),
+    ]
+    if SUMMARY_BATCH_MODE:
+        jobs.append(asyncio.create_task(_run_every(SUMMARY_BATCH_INTERVAL, flush_summary_batch)))
+    app.state.jobs = jobs
+    logger.info("Background jobs started ✅")
 
     logger.info("Application startup complete ✅")
 
@@ -64,14 +101,21 @@ async def lifespan(app: FastAPI):
 
     # ── SHUTDOWN ─────────────────────────────────────────────
     logger.info("Shutting down IVY AI Counsellor...")
+    for job in jobs:
+        job.cancel()
+    await asyncio.gather(*jobs, return_exceptions=True)
+    logger.info("Background jobs stopped ✅")
+
     try:
-        if scheduler.running:
-            scheduler.shutdown(wait=False)
-            logger.info("Scheduler stopped ✅")
+        save_embedding_cache()
     except Exception as e:
-        logger.warning("Scheduler shutdown error: %s", e)
+        logger.warning("Embedding cache save failed: %s", e)
+
+    shutdown_pools()
+    await close_shared_db()
 
     logger.info("Shutdown complete.")
+    stop_logging()
 
 
 # ── FastAPI app ───────────────────────────────────────────────────────────────
@@ -110,28 +154,52 @@ app.include_router(admin_router, prefix="/api/v1/admin", tags=["admin"])
 
 
 # ── Core endpoints ────────────────────────────────────────────────────────────
+def _static_json(payload: dict) -> tuple[bytes, str]:
+    """Encode a constant payload once and derive its weak ETag."""
+    body = orjson.dumps(payload)
+    return body, f'W/"{hashlib.md5(body).hexdigest()[:16]}"'
+
+
+def _cached_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve precomputed JSON, or 304 when the client already has it."""
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=10"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+_ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+_ROOT_BODY = _static_json({
+    "name":        "IVY AI Counsellor API",
+    "version":     "1.0.0",
+    "status":      "operational",
+    "environment": _ENVIRONMENT,
+    "docs":        "/docs",
+    "health":      "/api/v1/health",
+    "admin":       "/static/admin.html",
+})
+_HEALTH_BODIES = {
+    running: _static_json({
+        "status":      "healthy",
+        "environment": _ENVIRONMENT,
+        "scheduler":   "running" if running else "stopped",
+    })
+    for running in (True, False)
+}
+
+
 @app.get("/", tags=["root"])
-async def root():
+async def root(request: Request):
     """API information."""
-    return {
-        "name":        "IVY AI Counsellor API",
-        "version":     "1.0.0",
-        "status":      "operational",
-        "environment": os.getenv("ENVIRONMENT", "development"),
-        "docs":        "/docs",
-        "health":      "/api/v1/health",
-        "admin":       "/static/admin.html",
-    }
+    return _cached_response(request, *_ROOT_BODY)
 
 
 @app.get("/api/v1/health", tags=["root"])
-async def health():
+async def health(request: Request):
     """Health check — used by Railway as readiness probe."""
-    return {
-        "status":      "healthy",
-        "environment": os.getenv("ENVIRONMENT", "development"),
-        "scheduler":   "running" if scheduler.running else "stopped",
-    }
+    jobs = getattr(request.app.state, "jobs", [])
+    running = bool(jobs) and not any(job.done() for job in jobs)
+    return _cached_response(request, *_HEALTH_BODIES[running])
 
 
 # ── Dev entrypoint ────────────────────────────────────────────────────────────
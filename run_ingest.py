@@ -7,31 +7,48 @@ sys.path.append(".")
 from dotenv import load_dotenv
 load_dotenv()
 
-from app.models.database import init_db
-from app.services.pdf_service import ingest_pdf
+from app.models.database import init_db, close_shared_db
+from app.services.pdf_service import ingest_pdfs_batch
 
 
-async def main():
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    pdfs = [
-        (os.path.join(BASE_DIR, "data", "pdfs", "australia_visa.pdf"), "australia_visa.pdf", "visa"),
-    ]
-    await init_db()
-    for file_path, filename, category in pdfs:
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PDFS = [
+    (os.path.join(BASE_DIR, "data", "pdfs", "australia_visa.pdf"), "australia_visa.pdf", "visa"),
+]
+
+
+def find_pdfs() -> list[tuple[str, str, str]]:
+    """Return the PDFS entries whose files exist, reporting the rest."""
+    found = []
+    for file_path, filename, category in PDFS:
         if not os.path.exists(file_path):
             print(f"SKIP — file not found: {file_path}")
             continue
-        print(f"\nIngesting: {filename} [{category}]...")
-        try:
-            summary = await ingest_pdf(file_path, filename, category)
-            print(f"  Done ✅")
-            print(f"  PDF ID:    {summary.pdf_id}")
-            print(f"  Pages:     {summary.pages_processed}/{summary.total_pages}")
-            print(f"  Chunks:    {summary.total_chunks}")
-            print(f"  Time:      {summary.time_taken_seconds}s")
-        except Exception as e:
-            print(f"  FAILED ❌  {e}")
+        found.append((file_path, filename, category))
+    return found
+
+
+async def main(found: list[tuple[str, str, str]]):
+    await init_db()
+    print(f"\nIngesting {len(found)} PDFs...")
+    for summary in await ingest_pdfs_batch(found):
+        print(f"\n{summary.filename} [{summary.category}]")
+        if not summary.success:
+            print(f"  FAILED ❌  {summary.error}")
+            continue
+        print(f"  Done ✅{'  (already ingested)' if summary.duplicate else ''}")
+        print(f"  PDF ID:    {summary.pdf_id}")
+        print(f"  Pages:     {summary.pages_processed}/{summary.total_pages}")
+        print(f"  Chunks:    {summary.total_chunks}")
+        print(f"  Time:      {summary.time_taken_seconds}s")
+    await close_shared_db()
     print("\nAll done.")
 
 
-asyncio.run(main())
\ No newline at end of file
+# Guarded so PDF extraction worker processes can import this module safely
+if __name__ == "__main__":
+    # Check inputs before paying for the event loop and DB initialisation
+    found = find_pdfs()
+    if not found:
+        sys.exit("ERROR: No PDFs found to ingest")
+    asyncio.run(main(found))
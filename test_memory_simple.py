@@ -40,18 +40,25 @@ def test_basic():
     
     # Test 5: Auto-expiry
     import time
+    from unittest.mock import patch
     from app.utils.memory import IDLE_EXPIRE_SECONDS
     
     _sessions.clear()
-    manager.add_message("test3", "user", "Hello")
+    # Simulate old session: expiry is indexed when activity is recorded, so
+    # drive the clock rather than editing last_activity afterwards
+    idle_since = time.monotonic() - (IDLE_EXPIRE_SECONDS + 100)
+    with patch("app.utils.memory.time.monotonic", return_value=idle_since):
+        manager.add_message("test3", "user", "Hello")
     manager.add_message("test4", "user", "Hi")
     
-    # Simulate old session
-    _sessions["test3"]["last_activity"] = time.time() - (IDLE_EXPIRE_SECONDS + 100)
-    
     expired = manager.expire_idle_sessions()
     assert expired == 1
     assert manager.get_session_count() == 1
+    # Idleness is measured on the monotonic clock, so a wall-clock jump
+    # (NTP step, manual change) must not expire the remaining session
+    with patch("app.utils.memory.time.time", return_value=time.time() + 10 * IDLE_EXPIRE_SECONDS):
+        assert manager.expire_idle_sessions() == 0
+    assert manager.get_session_count() == 1
     print("✓ Test 5 passed: Auto-expiry")
     
     print("\n✅ All tests passed!")
@@ -0,0 +1,8 @@
+"""Shared pytest setup: make `app` importable and load .env once per session."""
+import sys
+import pathlib
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from dotenv import load_dotenv
+load_dotenv()
@@ -0,0 +1,6 @@
+"""Display helpers shared by the fallback and intent test scripts."""
+
+
+def trunc(text: str, n: int = 60) -> str:
+    """Shorten text for display, marking the cut with an ellipsis."""
+    return text if len(text) <= n else text[:n] + "..."
@@ -0,0 +1,25 @@
+"""
+Run the fallback and intent test scripts in one event loop.
+
+Usage (from the repository root): python -m tests.run_all
+Both scripts then share one dotenv load and the services' API clients.
+"""
+import asyncio
+import sys
+sys.path.append(".")
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from tests.test_fallback import main as fallback_main
+from tests.test_intent import intent_test_main
+
+
+async def main():
+    # Sequential so each script's report prints as one block
+    await fallback_main()
+    await intent_test_main()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
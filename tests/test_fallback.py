@@ -3,87 +3,127 @@ Test fallback service with all 5 scenarios.
 Tests: OFF_TOPIC, ESCALATE, PARTIAL, GAP, DIRECT
 """
 import asyncio
+import re
 import sys
-sys.path.append(".")
+from typing import NamedTuple
 
-from dotenv import load_dotenv
-load_dotenv()
+if __name__ == "__main__":
+    # Run directly as a script; under pytest, tests/conftest.py does this once
+    sys.path.append(".")
+    from dotenv import load_dotenv
+    load_dotenv()
 
 from app.services.fallback_service import get_fallback_response, classify_query
+from tests.helpers import trunc
+
+# Fallback calls in flight at once (keeps clear of upstream rate limits)
+MAX_CONCURRENT_CALLS = 8
+_call_limit = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
 
 # ── Test cases ────────────────────────────────────────────
+class Case(NamedTuple):
+    name: str
+    query: str
+    score: float
+    expected_type: str
+    expected_keywords: tuple[str, ...]
+
+
 TEST_CASES = [
-    {
-        "name": "OFF TOPIC — Cricket score",
-        "query": "What is the cricket score today?",
-        "score": 0.10,
-        "expected_type": "OFF_TOPIC",
-        "expected_keywords": ["study abroad", "universities", "visas"],
-    },
-    {
-        "name": "OFF TOPIC — Weather question",
-        "query": "What is the weather like in London today?",
-        "score": 0.05,
-        "expected_type": "OFF_TOPIC",
-        "expected_keywords": ["study abroad", "visas"],
-    },
-    {
-        "name": "SENSITIVE — Visa rejection distress",
-        "query": "My visa got rejected and I am devastated. I don't know what to do.",
-        "score": 0.20,
-        "expected_type": "ESCALATE",
-        "expected_keywords": ["counsellor", "personalised", "call"],
-    },
-    {
-        "name": "SENSITIVE — Financial distress",
-        "query": "I cannot afford the fees anymore and I am very stressed about my future.",
-        "score": 0.15,
-        "expected_type": "ESCALATE",
-        "expected_keywords": ["counsellor", "team"],
-    },
-    {
-        "name": "PARTIAL MATCH — Some context found",
-        "query": "What scholarships are available for Indian students in Australia?",
-        "score": 0.60,
-        "expected_type": "PARTIAL",
-        "expected_keywords": ["counsellor", "help"],
-    },
-    {
-        "name": "KNOWLEDGE GAP — Obscure question",
-        "query": "What is the visa processing time for a student from a small town in Bihar?",
-        "score": 0.25,
-        "expected_type": "GAP",
-        "expected_keywords": ["counsellor", "free"],
-    },
-    {
-        "name": "KNOWLEDGE GAP — Unknown university policy",
-        "query": "Does University of Wollongong accept 3 year degrees from Tier 3 colleges?",
-        "score": 0.28,
-        "expected_type": "GAP",
-        "expected_keywords": ["counsellor"],
-    },
-    {
-        "name": "STUDY ABROAD — Normal question low score",
-        "query": "What is the application process for Canada student visa?",
-        "score": 0.35,
-        "expected_type": "GAP",
-        "expected_keywords": ["counsellor"],
-    },
+    Case(
+        name="OFF TOPIC — Cricket score",
+        query="What is the cricket score today?",
+        score=0.10,
+        expected_type="OFF_TOPIC",
+        expected_keywords=("study abroad", "universities", "visas"),
+    ),
+    Case(
+        name="OFF TOPIC — Weather question",
+        query="What is the weather like in London today?",
+        score=0.05,
+        expected_type="OFF_TOPIC",
+        expected_keywords=("study abroad", "visas"),
+    ),
+    Case(
+        name="SENSITIVE — Visa rejection distress",
+        query="My visa got rejected and I am devastated. I don't know what to do.",
+        score=0.20,
+        expected_type="ESCALATE",
+        expected_keywords=("counsellor", "personalised", "call"),
+    ),
+    Case(
+        name="SENSITIVE — Financial distress",
+        query="I cannot afford the fees anymore and I am very stressed about my future.",
+        score=0.15,
+        expected_type="ESCALATE",
+        expected_keywords=("counsellor", "team"),
+    ),
+    Case(
+        name="PARTIAL MATCH — Some context found",
+        query="What scholarships are available for Indian students in Australia?",
+        score=0.60,
+        expected_type="PARTIAL",
+        expected_keywords=("counsellor", "help"),
+    ),
+    Case(
+        name="KNOWLEDGE GAP — Obscure question",
+        query="What is the visa processing time for a student from a small town in Bihar?",
+        score=0.25,
+        expected_type="GAP",
+        expected_keywords=("counsellor", "free"),
+    ),
+    Case(
+        name="KNOWLEDGE GAP — Unknown university policy",
+        query="Does University of Wollongong accept 3 year degrees from Tier 3 colleges?",
+        score=0.28,
+        expected_type="GAP",
+        expected_keywords=("counsellor",),
+    ),
+    Case(
+        name="STUDY ABROAD — Normal question low score",
+        query="What is the application process for Canada student visa?",
+        score=0.35,
+        expected_type="GAP",
+        expected_keywords=("counsellor",),
+    ),
 ]
 
 
-def check_keywords(response: str, keywords: list[str]) -> bool:
+async def run_case(query: str, score: float, session_id: str):
+    """Get one fallback response; errors are returned, not raised."""
+    async with _call_limit:
+        try:
+            return await get_fallback_response(
+                query=query,
+                best_score=score,
+                session_id=session_id
+            )
+        except Exception as e:
+            return e
+
+
+def keyword_pattern(keywords: tuple[str, ...]) -> re.Pattern:
+    """Compile keywords into one case-insensitive alternation."""
+    return re.compile("|".join(re.escape(kw) for kw in keywords), re.IGNORECASE)
+
+
+# One scan per response instead of a lowercase copy plus a loop over keywords
+KEYWORD_PATTERNS = [keyword_pattern(tc.expected_keywords) for tc in TEST_CASES]
+
+
+def check_keywords(response: str, pattern: re.Pattern) -> bool:
     """Check if any expected keyword appears in response."""
-    response_lower = response.lower()
-    return any(kw.lower() in response_lower for kw in keywords)
+    return pattern.search(response) is not None
 
 
 async def test_classification():
     """Test query classification separately."""
-    print("=" * 55)
-    print("TEST BLOCK 1 — QUERY CLASSIFICATION")
-    print("=" * 55)
-    print()
+    lines: list[str] = []
+    log = lines.append
+    log("=" * 55)
+    log("TEST BLOCK 1 — QUERY CLASSIFICATION")
+    log("=" * 55)
+    log("")
 
     classification_tests = [
         ("What is the cricket score?",              "off_topic"),
@@ -95,73 +135,77 @@ async def test_classification():
         ("Can I work while studying in Canada?",    "study_abroad"),
     ]
 
+    results = await asyncio.gather(*[classify_query(query) for query, _ in classification_tests])
+
     passed = 0
-    for query, expected in classification_tests:
-        result = await classify_query(query)
+    for (query, expected), result in zip(classification_tests, results):
         status = "✅ PASS" if result == expected else "❌ FAIL"
         if result == expected:
             passed += 1
-        print(f"  {status}")
-        print(f"    Query:    \"{query[:55]}\"")
-        print(f"    Expected: {expected}")
-        print(f"    Got:      {result}")
-        print()
+        log(f"  {status}")
+        log(f"    Query:    \"{trunc(query, 55)}\"")
+        log(f"    Expected: {expected}")
+        log(f"    Got:      {result}")
+        log("")
 
-    print(f"  Classification: {passed}/{len(classification_tests)} passed")
-    print()
-    return passed, len(classification_tests)
+    log(f"  Classification: {passed}/{len(classification_tests)} passed")
+    log("")
+    return passed, len(classification_tests), lines
 
 
 async def test_fallback_responses():
     """Test full fallback response generation."""
-    print("=" * 55)
-    print("TEST BLOCK 2 — FALLBACK RESPONSES")
-    print("=" * 55)
-    print()
+    lines: list[str] = []
+    log = lines.append
+    log("=" * 55)
+    log("TEST BLOCK 2 — FALLBACK RESPONSES")
+    log("=" * 55)
+    log("")
 
     passed = 0
     total = len(TEST_CASES)
 
-    for i, tc in enumerate(TEST_CASES, 1):
-        print(f"Test {i}: {tc['name']}")
-        print(f"  Query: \"{tc['query'][:60]}\"")
-        print(f"  Score: {tc['score']}")
+    # All cases run concurrently; results are reported in case order
+    responses = await asyncio.gather(*[
+        run_case(tc.query, tc.score, f"fallback-test-{i}")
+        for i, tc in enumerate(TEST_CASES, 1)
+    ])
 
-        try:
-            response = await get_fallback_response(
-                query=tc["query"],
-                best_score=tc["score"],
-                session_id=f"fallback-test-{i}"
-            )
+    for i, (tc, pattern, response) in enumerate(zip(TEST_CASES, KEYWORD_PATTERNS, responses), 1):
+        log(f"Test {i}: {tc.name}")
+        log(f"  Query: \"{trunc(tc.query)}\"")
+        log(f"  Score: {tc.score}")
 
+        if isinstance(response, Exception):
+            log(f"  ❌ ERROR — {response}")
+        else:
             # Check keywords
-            keyword_found = check_keywords(response, tc["expected_keywords"])
+            keyword_found = check_keywords(response, pattern)
 
             if keyword_found:
-                print(f"  ✅ PASS")
+                log(f"  ✅ PASS")
                 passed += 1
             else:
-                print(f"  ❌ FAIL — expected keywords not found")
-                print(f"     Expected one of: {tc['expected_keywords']}")
-
-            print(f"  Response: \"{response[:100]}\"")
+                log(f"  ❌ FAIL — expected keywords not found")
+                log(f"     Expected one of: {tc.expected_keywords}")
 
-        except Exception as e:
-            print(f"  ❌ ERROR — {e}")
+            log(f"  Response: \"{trunc(response, 100)}\"")
 
-        print()
+        log("")
 
-    print(f"  Fallback responses: {passed}/{total} passed")
-    print()
-    return passed, total
+    log(f"  Fallback responses: {passed}/{total} passed")
+    log("")
+    return passed, total, lines
 
 
 async def test_score_thresholds():
     """Test that score thresholds route correctly."""
-    print("=" * 55)
-    print("TEST BLOCK 3 — SCORE THRESHOLD ROUTING")
-    print("=" * 55)
-    print()
+    lines: list[str] = []
+    log = lines.append
+    log("=" * 55)
+    log("TEST BLOCK 3 — SCORE THRESHOLD ROUTING")
+    log("=" * 55)
+    log("")
 
     threshold_tests = [
         (0.80, "study_abroad", "DIRECT — score above 0.75 should not trigger fallback"),
@@ -173,30 +217,30 @@ async def test_score_thresholds():
         (0.90, "sensitive",    "ESCALATE — regardless of score"),
     ]
 
-    passed = 0
-    for score, classification, description in threshold_tests:
-        query = "What is the visa process?" if classification == "study_abroad" \
+    def threshold_query(classification: str) -> str:
+        return "What is the visa process?" if classification == "study_abroad" \
            else "What is cricket?" if classification == "off_topic" \
            else "My visa got rejected and I am very stressed"
 
-        try:
-            response = await get_fallback_response(
-                query=query,
-                best_score=score,
-                session_id=f"threshold-test-{score}"
-            )
-            print(f"  Score {score} | {description}")
-            print(f"  Response: \"{response[:80]}\"")
-            print(f"  ✅ OK")
+    responses = await asyncio.gather(*[
+        run_case(threshold_query(classification), score, f"threshold-test-{score}")
+        for score, classification, _ in threshold_tests
+    ])
+
+    passed = 0
+    for (score, _, description), response in zip(threshold_tests, responses):
+        log(f"  Score {score} | {description}")
+        if isinstance(response, Exception):
+            log(f"  ❌ ERROR — {response}")
+        else:
+            log(f"  Response: \"{trunc(response, 80)}\"")
+            log(f"  ✅ OK")
             passed += 1
-        except Exception as e:
-            print(f"  Score {score} | {description}")
-            print(f"  ❌ ERROR — {e}")
-        print()
+        log("")
 
-    print(f"  Threshold routing: {passed}/{len(threshold_tests)} passed")
-    print()
-    return passed, len(threshold_tests)
+    log(f"  Threshold routing: {passed}/{len(threshold_tests)} passed")
+    log("")
+    return passed, len(threshold_tests), lines
 
 
 async def main():
@@ -206,10 +250,14 @@ async def main():
     print("=" * 55)
     print()
 
-    # Run all test blocks
-    c_pass, c_total = await test_classification()
-    f_pass, f_total = await test_fallback_responses()
-    t_pass, t_total = await test_score_thresholds()
+    # Run all test blocks concurrently; each buffers its own output so the
+    # log stays sectioned, and is printed in order once all have finished
+    (c_pass, c_total, c_log), (f_pass, f_total, f_log), (t_pass, t_total, t_log) = await asyncio.gather(
+        test_classification(),
+        test_fallback_responses(),
+        test_score_thresholds(),
+    )
+    sys.stdout.write("".join(line + "\n" for lines in (c_log, f_log, t_log) for line in lines))
 
     # Final summary
     total_passed = c_pass + f_pass + t_pass
@@ -235,4 +283,5 @@ async def main():
     print()
 
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
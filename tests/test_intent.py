@@ -3,16 +3,50 @@ Test intent classifier with progressive 10-message conversation.
 Score should climb from 0 to above 60 by end.
 """
 import asyncio
+import functools
+import io
+import os
 import sys
-sys.path.append(".")
 
-from dotenv import load_dotenv
-load_dotenv()
+if __name__ == "__main__":
+    # Run directly as a script; under pytest, tests/conftest.py does this once
+    sys.path.append(".")
+    from dotenv import load_dotenv
+    load_dotenv()
 
-from app.utils.memory import add_message, clear_session
+from app.utils.memory import add_messages, clear_session
 from app.services.intent_service import run_intent
+from tests.helpers import trunc
+
+# Set IVY_TEST_VERBOSE=1 to score the conversation after every pair;
+# otherwise only the final conversation is classified (one Claude call)
+VERBOSE = os.getenv("IVY_TEST_VERBOSE", "") == "1"
+
+# Profile fields reported after each snapshot, in display order
+_FIELDS = (
+    ("Country", "target_country"),
+    ("Course",  "target_course"),
+    ("IELTS",   "ielts_score"),
+    ("Score",   "percentage"),
+    ("Budget",  "budget_inr"),
+    ("Intake",  "target_intake"),
+    ("Phone",   "phone"),
+)
+
+# Score bar for every lead score 0-100 (one block per 5 points)
+_BARS = {score: "█" * (score // 5) + "░" * (20 - score // 5) for score in range(101)}
+
+async def intent_test_main():
+    # Output is buffered and written once per section, not line by line
+    buf = io.StringIO()
+    log = functools.partial(print, file=buf)
+
+    def flush():
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
+        buf.seek(0)
+        buf.truncate()
 
-async def test():
     session_id = "progressive-test-001"
     clear_session(session_id)
 
@@ -39,12 +73,12 @@ async def test():
         ("assistant", "Absolutely! Fall 2025 applications are open now. Let me connect you with our expert counsellor for a free session."),
     ]
 
-    print("=" * 55)
-    print("PROGRESSIVE INTENT SCORING TEST")
-    print("=" * 55)
-    print()
+    log("=" * 55)
+    log("PROGRESSIVE INTENT SCORING TEST")
+    log("=" * 55)
+    log()
 
-    # Run classifier after each pair of messages
+    # Run classifier after each pair of messages (verbose mode only)
     pair_num = 0
     for i in range(0, len(conversation), 2):
         pair_num += 1
@@ -52,113 +86,112 @@ async def test():
         assistant_msg = conversation[i + 1]
 
         # Add both messages to memory
-        add_message(session_id, user_msg[0], user_msg[1])
-        add_message(session_id, assistant_msg[0], assistant_msg[1])
+        add_messages(session_id, [user_msg, assistant_msg])
+
+        if not VERBOSE:
+            continue
 
         # Run intent classifier
         result = await run_intent(session_id)
 
-        print(f"After Message {pair_num * 2 - 1} & {pair_num * 2}:")
-        print(f"  Student said:  \"{user_msg[1][:60]}...\"" if len(user_msg[1]) > 60 else f"  Student said:  \"{user_msg[1]}\"")
+        log(f"After Message {pair_num * 2 - 1} & {pair_num * 2}:")
+        log(f"  Student said:  \"{trunc(user_msg[1])}\"")
 
         if result:
             # Score bar visualisation
-            bar_filled = int(result.lead_score / 5)
-            bar = "█" * bar_filled + "░" * (20 - bar_filled)
-            print(f"  Score:         {result.lead_score:3d}/100  [{bar}]")
-            print(f"  Intent:        {result.intent_level}")
+            bar = _BARS[max(0, min(100, result.lead_score))]
+            log(f"  Score:         {result.lead_score:3d}/100  [{bar}]")
+            log(f"  Intent:        {result.intent_level}")
 
             # Show what was extracted this round
             profile = result.extracted_profile
-            extracted = []
-            if profile.target_country:  extracted.append(f"Country={profile.target_country}")
-            if profile.target_course:   extracted.append(f"Course={profile.target_course}")
-            if profile.ielts_score:     extracted.append(f"IELTS={profile.ielts_score}")
-            if profile.percentage:      extracted.append(f"Score={profile.percentage}")
-            if profile.budget_inr:      extracted.append(f"Budget={profile.budget_inr}")
-            if profile.target_intake:   extracted.append(f"Intake={profile.target_intake}")
-            if profile.phone:           extracted.append(f"Phone={profile.phone}")
+            extracted = [f"{label}={value}" for label, attr in _FIELDS if (value := getattr(profile, attr))]
 
             if extracted:
-                print(f"  Extracted:     {', '.join(extracted)}")
+                log(f"  Extracted:     {', '.join(extracted)}")
             else:
-                print(f"  Extracted:     (nothing yet)")
+                log(f"  Extracted:     (nothing yet)")
 
             # Hot lead alert
             if result.lead_score >= 60:
-                print(f"  🔥 HOT LEAD — notification would trigger!")
+                log(f"  🔥 HOT LEAD — notification would trigger!")
         else:
-            print(f"  Score:         ERROR — classifier returned None")
+            log(f"  Score:         ERROR — classifier returned None")
+
+        log()
 
-        print()
+    flush()
 
-    print("=" * 55)
-    print("FINAL RESULT")
-    print("=" * 55)
+    log("=" * 55)
+    log("FINAL RESULT")
+    log("=" * 55)
 
     final = await run_intent(session_id)
     if final:
-        print(f"Intent Level:   {final.intent_level}")
-        print(f"Lead Score:     {final.lead_score}/100")
-        print(f"Summary:        {final.conversation_summary}")
-        print(f"Action:         {final.recommended_action}")
-        print()
-        print("Full Profile:")
+        log(f"Intent Level:   {final.intent_level}")
+        log(f"Lead Score:     {final.lead_score}/100")
+        log(f"Summary:        {final.conversation_summary}")
+        log(f"Action:         {final.recommended_action}")
+        log()
+        log("Full Profile:")
         p = final.extracted_profile
-        print(f"  Name:         {p.name or 'Not provided'}")
-        print(f"  Phone:        {p.phone or 'Not provided'}")
-        print(f"  Email:        {p.email or 'Not provided'}")
-        print(f"  Course:       {p.target_course or 'Not provided'}")
-        print(f"  Country:      {p.target_country or 'Not provided'}")
-        print(f"  Intake:       {p.target_intake or 'Not provided'}")
-        print(f"  Budget:       {p.budget_inr or 'Not provided'}")
-        print(f"  IELTS:        {p.ielts_score or 'Not provided'}")
-        print(f"  Percentage:   {p.percentage or 'Not provided'}")
-        print()
+        log(f"  Name:         {p.name or 'Not provided'}")
+        log(f"  Phone:        {p.phone or 'Not provided'}")
+        log(f"  Email:        {p.email or 'Not provided'}")
+        log(f"  Course:       {p.target_course or 'Not provided'}")
+        log(f"  Country:      {p.target_country or 'Not provided'}")
+        log(f"  Intake:       {p.target_intake or 'Not provided'}")
+        log(f"  Budget:       {p.budget_inr or 'Not provided'}")
+        log(f"  IELTS:        {p.ielts_score or 'Not provided'}")
+        log(f"  Percentage:   {p.percentage or 'Not provided'}")
+        log()
 
         # Pass/Fail
-        print("=" * 55)
-        print("TEST RESULTS")
-        print("=" * 55)
+        log("=" * 55)
+        log("TEST RESULTS")
+        log("=" * 55)
         passed = 0
         total = 4
 
         # Test 1: Final score above 60
         if final.lead_score >= 60:
-            print(f"  ✅ PASS — Final score {final.lead_score} is above 60")
+            log(f"  ✅ PASS — Final score {final.lead_score} is above 60")
             passed += 1
         else:
-            print(f"  ❌ FAIL — Final score {final.lead_score} is below 60")
+            log(f"  ❌ FAIL — Final score {final.lead_score} is below 60")
 
         # Test 2: Intent is HOT_LEAD
         if final.intent_level == "HOT_LEAD":
-            print(f"  ✅ PASS — Intent is HOT_LEAD")
+            log(f"  ✅ PASS — Intent is HOT_LEAD")
             passed += 1
         else:
-            print(f"  ❌ FAIL — Intent is {final.intent_level}, expected HOT_LEAD")
+            log(f"  ❌ FAIL — Intent is {final.intent_level}, expected HOT_LEAD")
 
         # Test 3: Country extracted
         if final.extracted_profile.target_country:
-            print(f"  ✅ PASS — Country extracted: {final.extracted_profile.target_country}")
+            log(f"  ✅ PASS — Country extracted: {final.extracted_profile.target_country}")
             passed += 1
         else:
-            print(f"  ❌ FAIL — Country not extracted")
+            log(f"  ❌ FAIL — Country not extracted")
 
         # Test 4: IELTS extracted
         if final.extracted_profile.ielts_score:
-            print(f"  ✅ PASS — IELTS extracted: {final.extracted_profile.ielts_score}")
+            log(f"  ✅ PASS — IELTS extracted: {final.extracted_profile.ielts_score}")
             passed += 1
         else:
-            print(f"  ❌ FAIL — IELTS score not extracted")
+            log(f"  ❌ FAIL — IELTS score not extracted")
 
-        print()
-        print(f"  Result: {passed}/{total} tests passed")
+        log()
+        log(f"  Result: {passed}/{total} tests passed")
 
         if passed == total:
-            print(f"  🎉 ALL TESTS PASSED")
+            log(f"  🎉 ALL TESTS PASSED")
         else:
-            print(f"  ⚠️  Some tests failed — check scoring logic")
+            log(f"  ⚠️  Some tests failed — check scoring logic")
+
+    log()
+    flush()
 
-    print()
 
-asyncio.run(test())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(intent_test_main())